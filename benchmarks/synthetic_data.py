@@ -0,0 +1,350 @@
+import argparse
+import json
+import os
+from xml.sax.saxutils import escape
+
+import numpy as np
+import pandas as pd
+
+
+# Rows generated at a time, so large inputs are written in constant memory
+CHUNK_SIZE = 100_000
+
+# Excel limits a sheet to 1,048,576 rows including the header
+EXCEL_SHEET_ROWS = 1_048_575
+
+# File names of the raw sources in data/raw
+RAW_FILES = {
+    "customer_details": "cust.xlsx",
+    "invoice_details": "invoice.xml",
+    "product_details": "product.json",
+    "region_details": "regiontxt",
+    "shipping_details": "shippuingaddress_20240521.csv.csv",
+}
+
+LETTERS = np.array(list("ABCDEFGHIJKLMNOPQRSTUVWXYZ"))
+
+FIRST_NAMES = np.array(["Jessica", "George", "Bill", "Maria", "Ahmed", "Chen", "Olga", "Tom", "Priya", "Luis"])
+LAST_NAMES = np.array(["Myrick", "Zrebassa", "Shonely", "Garcia", "Khan", "Wang", "Ivanova", "Smith", "Patel", "Lopez"])
+SEGMENTS = np.array(["Consumer", "Corporate", "Home Office"])
+
+SHIP_MODES = np.array(["First Class", "Same Day", "Second Class", "Standard Class"])
+ORDER_PRIORITIES = np.array(["Critical", "High", "Medium", "Low"])
+
+# Category, sub-category and product ID prefix
+PRODUCT_TYPES = (
+    ("Office Supplies", "Storage", "OFF/STO"),
+    ("Office Supplies", "Paper", "OFF/PAP"),
+    ("Office Supplies", "Binders", "OFF/BIN"),
+    ("Furniture", "Chairs", "FUR/CHA"),
+    ("Furniture", "Tables", "FUR/TAB"),
+    ("Technology", "Phones", "TEC/PHO"),
+    ("Technology", "Machines", "TEC/MAC"),
+)
+PRODUCT_NAMES = np.array(["Box, Single Width", "Note Cards, Premium", "Executive Chair", "Conference Table", "Smart Phone"])
+
+# City, state, country, market and region of the locations shipped to
+LOCATIONS = (
+    ("San Francisco", "California", "United States", "US", "West"),
+    ("New York City", "New York", "United States", "US", "East"),
+    ("Manila", "National Capital", "Philippines", "APAC", "Southeast Asia"),
+    ("Mexico City", "Distrito Federal", "Mexico", "LATAM", "North"),
+    ("Hyderabad", "Telangana", "India", "APAC", "Central Asia"),
+    ("Balikesir", "Balikesir", "Turkey", "EMEA", "EMEA"),
+    ("Vienna", "Vienna", "Austria", "EU", "Central"),
+    ("Basra", "Al Basrah", "Iraq", "EMEA", "EMEA"),
+    ("Caloundra", "Queensland", "Australia", "APAC", "Oceania"),
+    ("Castrop-Rauxel", "North Rhine-Westphalia", "Germany", "EU", "Central"),
+)
+STREETS = np.array(["Lisa Forest", "Harry Loop", "Fowler Via", "Thomas Island", "Underwood View", "Susan Pike"])
+UNITS = np.array(["", "", " Apt. 065", " Suite 236"])
+
+SHIPPING_PREAMBLE = (
+    "FILEDESC: CUSTOMER ADDRESS EXTRACT FILE\t\t\t\t\t\t\t\t\t\t\n"
+    "SOURCESYS: ADAM\t\t\t\t\t\t\t\t\t\t\n"
+    "EXTRACT DATE: 2024-05-21\t\t\t\t\t\t\t\t\t\t\n"
+    "USER:3456789\t\t\t\t\t\t\t\t\t\t\n"
+    "\t\t\t\t\t\t\t\t\t\t\n"
+    "--------------\t-----------------\t----------------\t--------------\t-----------------\t\t\t\t\t\t\n"
+)
+SHIPPING_HEADER = "id,customerid,city,state,country,postal_code,effstart,effend,streetadd\n"
+
+# Share of shipping rows with each quirk found in the extracts
+SHIPPING_QUIRKS = {
+    "blank": 0.05,
+    "merged_customer_id": 0.002,
+    "address_comma": 0.002,
+    "quoted": 0.002,
+    "extra_empty": 0.002,
+}
+
+
+def _rng(seed: int, table: str, chunk: int) -> np.random.Generator:
+    """Return a generator seeded by the table and chunk, so chunks can be regenerated independently."""
+    return np.random.default_rng([seed, sorted(RAW_FILES).index(table), chunk])
+
+
+def _chunk_bounds(rows: int, chunk_size: int = CHUNK_SIZE):
+    """Yield the chunk number, first row and number of rows of each chunk."""
+    for chunk, start in enumerate(range(0, rows, chunk_size)):
+        yield chunk, start, min(chunk_size, rows - start)
+
+
+def _customer_ids(numbers: np.ndarray) -> np.ndarray:
+    """Return customer IDs in the "AB-12345" format for customer numbers."""
+    initials = np.char.add(LETTERS[numbers % 26], LETTERS[numbers // 26 % 26])
+
+    return np.char.add(np.char.add(initials, "-"), (10_000 + numbers % 90_000).astype(str))
+
+
+def _dates(rng: np.random.Generator, size: int, start: str = "2001-01-01", days: int = 5000) -> pd.DatetimeIndex:
+    """Return random dates from the start date."""
+    return pd.Timestamp(start) + pd.to_timedelta(rng.integers(0, days, size), unit="D")
+
+
+def customer_chunk(seed: int, chunk: int, start: int, rows: int) -> pd.DataFrame:
+    """Generate customer rows as they appear in cust.xlsx."""
+    rng = _rng(seed, "customer_details", chunk)
+    numbers = np.arange(start, start + rows)
+    prefixes = np.char.add(np.char.add(LETTERS[rng.integers(0, 26, rows)], LETTERS[rng.integers(0, 26, rows)]), "X")
+
+    return pd.DataFrame({
+        "cusid": np.char.add(prefixes, np.char.add(_customer_ids(numbers), "0000")),
+        "cusnm": np.char.add(np.char.add(FIRST_NAMES[rng.integers(0, 10, rows)], " "), LAST_NAMES[rng.integers(0, 10, rows)]),
+        "sgmnt": SEGMENTS[rng.integers(0, len(SEGMENTS), rows)],
+    })
+
+
+def invoice_chunk(seed: int, chunk: int, start: int, rows: int) -> pd.DataFrame:
+    """Generate invoice rows as they appear in invoice.xml."""
+    rng = _rng(seed, "invoice_details", chunk)
+    numbers = np.arange(start, start + rows)
+    order_dates = _dates(rng, rows, "2011-01-01", 1460)
+    product_types = rng.integers(0, len(PRODUCT_TYPES), rows)
+    sale_values = rng.uniform(5, 2000, rows).round(4)
+
+    return pd.DataFrame({
+        "Order_ID": [f"{market}-{date.year}-{1000 + number // 3}" for market, date, number in zip(
+            np.array(["US", "IN", "ES", "MX"])[numbers % 4], order_dates, numbers
+        )],
+        "Line_No": numbers + 1,
+        "Order_Date": order_dates.strftime("%d/%m/%Y"),
+        "Ship_Date": (order_dates + pd.to_timedelta(rng.integers(0, 8, rows), unit="D")).strftime("%d/%m/%Y"),
+        "Ship_Mode": SHIP_MODES[rng.integers(0, len(SHIP_MODES), rows)],
+        "Customer_ID": _customer_ids(rng.integers(0, max(rows, 1000), rows)),
+        "Product_ID": [f"{PRODUCT_TYPES[i][2]}-{number:06d}" for i, number in zip(product_types, rng.integers(0, 999_999, rows))],
+        "Sale_Value": sale_values,
+        "Quantity": rng.integers(1, 15, rows),
+        "Discount": rng.choice([0, 0.1, 0.2, 0.5], rows),
+        "Profit": (sale_values * rng.uniform(-0.3, 0.4, rows)).round(4),
+        "Shipping_Cost": (sale_values * rng.uniform(0.01, 0.1, rows)).round(4),
+        "Order_Priority": ORDER_PRIORITIES[rng.integers(0, len(ORDER_PRIORITIES), rows)],
+    })
+
+
+def product_chunk(seed: int, chunk: int, start: int, rows: int) -> pd.DataFrame:
+    """Generate product rows as they appear in product.json."""
+    rng = _rng(seed, "product_details", chunk)
+    product_types = rng.integers(0, len(PRODUCT_TYPES), rows)
+
+    return pd.DataFrame({
+        "Product_ID": [f"{PRODUCT_TYPES[i][2]}-{number:06d}" for i, number in zip(product_types, range(start, start + rows))],
+        "Category": [PRODUCT_TYPES[i][0] for i in product_types],
+        "Sub-Category": [PRODUCT_TYPES[i][1] for i in product_types],
+        "Product_Name": PRODUCT_NAMES[rng.integers(0, len(PRODUCT_NAMES), rows)],
+    })
+
+
+def _location(numbers: np.ndarray) -> tuple:
+    """Return the location index and state suffix of each region number.
+
+    Regions cycle through LOCATIONS, with a numbered state for each pass so
+    every region has its own state.
+    """
+    passes = numbers // len(LOCATIONS)
+    suffixes = np.where(passes == 0, "", np.char.add(" ", passes.astype(str)))
+
+    return numbers % len(LOCATIONS), suffixes
+
+
+def region_chunk(seed: int, chunk: int, start: int, rows: int) -> pd.DataFrame:
+    """Generate region rows as they appear in regiontxt."""
+    numbers = np.arange(start, start + rows)
+    locations, suffixes = _location(numbers)
+
+    return pd.DataFrame({
+        "index": numbers * 2,
+        "Region_ID": 6_554_348 + numbers,
+        "State": [LOCATIONS[i][1] + suffix for i, suffix in zip(locations, suffixes)],
+        "Country": [LOCATIONS[i][2] for i in locations],
+        "Market": [LOCATIONS[i][3] for i in locations],
+        "Region": [LOCATIONS[i][4] for i in locations],
+    })
+
+
+def shipping_lines(seed: int, chunk: int, start: int, rows: int, regions: int) -> list:
+    """Generate raw shipping extract lines, including the misaligned rows found in the extracts."""
+    rng = _rng(seed, "shipping_details", chunk)
+    locations, suffixes = _location(rng.integers(0, regions, rows))
+    customer_ids = _customer_ids(rng.integers(0, max(rows, 1000), rows))
+    starts = _dates(rng, rows).strftime("%d/%m/%Y")
+    ends = np.where(rng.random(rows) < 0.6, "", _dates(rng, rows, "2008-01-01").strftime("%d/%m/%Y"))
+    postal_codes = np.where(rng.random(rows) < 0.85, "", rng.integers(1000, 99999, rows).astype(str))
+    numbers = rng.integers(1, 99999, rows).astype(str)
+    streets = STREETS[rng.integers(0, len(STREETS), rows)]
+    units = UNITS[rng.integers(0, len(UNITS), rows)]
+    quirks = rng.random(rows)
+
+    lines = []
+    for i in range(rows):
+        city, state, country = LOCATIONS[locations[i]][:3]
+        state += suffixes[i]
+        address = f"{numbers[i]} {streets[i]}{units[i]}"
+        fields = [str(100_000 + start + i), customer_ids[i], city, state, country, postal_codes[i], starts[i], ends[i], address]
+
+        threshold = SHIPPING_QUIRKS["blank"]
+        if quirks[i] < threshold:
+            lines.append(",,,,,,,,\n")
+            continue
+
+        # Each quirk takes the next band of the random draw
+        for quirk in ("merged_customer_id", "address_comma", "quoted", "extra_empty"):
+            if threshold <= quirks[i] < threshold + SHIPPING_QUIRKS[quirk]:
+                if quirk == "merged_customer_id":
+                    fields[1:3] = [customer_ids[i] + city]
+                elif quirk == "address_comma":
+                    # Only seen in rows without a postal code or end date
+                    fields[5] = fields[7] = ""
+                    fields[8] = f"{numbers[i]} {streets[i]}, Suite {numbers[i][:3]}"
+                elif quirk == "quoted":
+                    fields[4] = f'""{country}'
+                    fields[6] = f'"{starts[i]}"'
+                else:
+                    fields[3:3] = [""]
+            threshold += SHIPPING_QUIRKS[quirk]
+
+        lines.append(",".join(fields) + "\n")
+
+    return lines
+
+
+def write_customers(path: str, rows: int, seed: int = 0) -> None:
+    """Write cust.xlsx, starting a new sheet each time a sheet is full."""
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    sheet = None
+    sheet_rows = EXCEL_SHEET_ROWS
+
+    for chunk, start, chunk_rows in _chunk_bounds(rows):
+        for values in customer_chunk(seed, chunk, start, chunk_rows).itertuples(index=False):
+            if sheet_rows == EXCEL_SHEET_ROWS:
+                sheet = workbook.create_sheet(f"Sheet{len(workbook.worksheets) + 1}")
+                sheet.append(["cusid", "cusnm", "sgmnt"])
+                sheet_rows = 0
+
+            sheet.append(list(values))
+            sheet_rows += 1
+
+    workbook.save(path)
+
+
+def write_invoices(path: str, rows: int, seed: int = 0) -> None:
+    """Write invoice.xml with one <row> element per invoice line."""
+    with open(path, "w") as f:
+        f.write('<?xml version="1.0"?>\n<data>\n')
+
+        for chunk, start, chunk_rows in _chunk_bounds(rows):
+            invoices = invoice_chunk(seed, chunk, start, chunk_rows)
+            columns = list(invoices.columns)
+
+            f.writelines(
+                "  <row>\n"
+                + "".join(f"    <{column}>{escape(str(value))}</{column}>\n" for column, value in zip(columns, values))
+                + "  </row>\n"
+                for values in invoices.itertuples(index=False)
+            )
+
+        f.write("</data>\n")
+
+
+def write_products(path: str, rows: int, seed: int = 0) -> None:
+    """Write product.json in pandas' columns orientation, one column at a time."""
+    columns = list(product_chunk(seed, 0, 0, 0).columns)
+
+    with open(path, "w") as f:
+        f.write("{")
+
+        for column_number, column in enumerate(columns):
+            f.write(("," if column_number else "") + json.dumps(column) + ":{")
+
+            for chunk, start, chunk_rows in _chunk_bounds(rows):
+                values = product_chunk(seed, chunk, start, chunk_rows)[column]
+                f.write(("," if start else "") + ",".join(
+                    f'"{start + i}":{json.dumps(value)}' for i, value in enumerate(values)
+                ))
+
+            f.write("}")
+
+        f.write("}")
+
+
+def write_regions(path: str, rows: int, seed: int = 0) -> None:
+    """Write the tab-delimited regiontxt, whose header starts with a tab."""
+    with open(path, "w", newline="") as f:
+        f.write("\tRegion_ID\tState\tCountry\tMarket\tRegion\r\n")
+
+        for chunk, start, chunk_rows in _chunk_bounds(rows):
+            region_chunk(seed, chunk, start, chunk_rows).to_csv(f, sep="\t", header=False, index=False, lineterminator="\r\n")
+
+
+def write_shipping(path: str, rows: int, seed: int = 0, regions: int = None) -> None:
+    """Write the shipping extract with its preamble and trailer."""
+    with open(path, "w") as f:
+        f.write(SHIPPING_PREAMBLE)
+        f.write(SHIPPING_HEADER)
+
+        for chunk, start, chunk_rows in _chunk_bounds(rows):
+            f.writelines(shipping_lines(seed, chunk, start, chunk_rows, regions or rows))
+
+        f.write(f"T,{rows},X,20240521,42H7FQ00000002\n")
+
+
+WRITERS = {
+    "customer_details": write_customers,
+    "invoice_details": write_invoices,
+    "product_details": write_products,
+    "region_details": write_regions,
+    "shipping_details": write_shipping,
+}
+
+
+def generate_raw_data(output_dir: str, rows: int, sources: list = None, seed: int = 0) -> dict:
+    """Write synthetic raw files for the sources, with the file names used in data/raw.
+
+    Shipping rows are located in the generated regions, so region IDs are
+    found when they are joined.
+
+    Returns:
+    A dictionary of the path written for each source.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    paths = {}
+
+    for source in sources or list(RAW_FILES):
+        paths[source] = os.path.join(output_dir, RAW_FILES[source])
+        WRITERS[source](paths[source], rows, seed)
+
+    return paths
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate synthetic raw inputs for benchmarking.")
+    parser.add_argument("output_dir")
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--sources", nargs="+", choices=list(RAW_FILES))
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    for source_name, source_path in generate_raw_data(args.output_dir, args.rows, args.sources, args.seed).items():
+        print(f"{source_name}: {source_path}")
@@ -1,11 +1,106 @@
 from bs4 import BeautifulSoup
+from typing import Callable
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import csv
+import numpy as np
+import importlib.util
+import json
+import os
 import pandas as pd
 import re
+import sys
+import time
+import xml.etree.ElementTree as ET
 
+from src.utils.instrumentation import instrument, measure_memory, record_event, write_manifest
+from src.utils.storage import table_path, write_table, write_table_chunks, write_table_metadata
 
+
+# Tokenizer used for the shipping extract when one is not given, e.g.
+# ETL_SHIPPING_TOKENIZER=aligned
+SHIPPING_TOKENIZER = os.environ.get("ETL_SHIPPING_TOKENIZER", "naive")
+
+# Engine used to read Excel workbooks, calamine when python-calamine is
+# installed, e.g. ETL_EXCEL_ENGINE=openpyxl
+EXCEL_ENGINE = os.environ.get(
+    "ETL_EXCEL_ENGINE",
+    "calamine" if importlib.util.find_spec("python_calamine") else "openpyxl"
+)
+
+# Decoder used for JSON sources, orjson when it is installed, e.g. ETL_JSON_DECODER=json
+JSON_DECODER = os.environ.get("ETL_JSON_DECODER", "orjson" if importlib.util.find_spec("orjson") else "json")
+
+# Records read at a time from newline-delimited JSON sources
+JSON_LINES_CHUNK_SIZE = 100_000
+
+# Bytes read from the start of a JSON source to detect whether it is newline-delimited
+JSON_PEEK_BYTES = 1 << 16
+
+# Closing braces tried as the end of a column of a columns-oriented JSON
+# document before it is decoded whole instead
+JSON_COLUMN_ATTEMPTS = 8
+
+# Start of a column of a columns-oriented JSON document, e.g. {"Product_ID":{
+_JSON_COLUMN_NAME = re.compile(rb'\s*[{,]\s*("(?:[^"\\]|\\.)*")\s*:\s*(?=\{)')
+
+# Possible end of a column, followed by the next column's name
+_JSON_COLUMN_END = re.compile(rb'\}\s*,\s*"')
+
+# Columns of the customer workbook used by the customer transform
+CUSTOMER_COLUMNS = ["cusid", "cusnm", "sgmnt"]
+
+# Shapes of the shipping extract's fields, used to align rows as they are read
+SHIPPING_ID_SHAPE = re.compile(r"^[0-9]+$")
+CUSTOMER_ID_SHAPE = re.compile(r"^([A-Za-z]{2}-[0-9]+)(.*)$")
+POSTAL_CODE_SHAPE = re.compile(r"^[0-9]*$")
+DATE_SHAPE = re.compile(r"^[\"\']*[0-9]{1,2}/[0-9]{1,2}/[0-9]{4}[\"\']*$")
+
+# A row already in place, which most rows are, matched in a single step
+ALIGNED_SHIPPING_ROW = re.compile(
+    r"^([0-9]+),([A-Za-z]{2}-[0-9]+),([^,]+),([^,]+),([^,]+),([0-9]*),"
+    r"([0-9]{2}/[0-9]{2}/[0-9]{4})?,([0-9]{2}/[0-9]{2}/[0-9]{4})?,([^,]*)$"
+)
+
+
+def _txt_column_names(filepath: str) -> list:
+    """Return the column names of a tab-delimited file.
+
+    The header of regiontxt starts with a tab, leaving its first column,
+    the row index, unnamed. When the header has fewer names than the first
+    row has values, the first column is named "index".
+    """
+    with open(filepath, "r") as f:
+        column_names = f.readline().strip().split("\t")
+        first_row = f.readline().strip().split("\t")
+
+    if len(column_names) < len(first_row):
+        column_names.insert(0, "index")
+
+    return column_names
+
+
+def _read_txt(filepath: str, chunksize: int = None):
+    """Read a tab-delimited file with the C parser, keeping every value as a string."""
+    return pd.read_csv(
+        filepath,
+        sep="\t",
+        header=None,
+        skiprows=1,
+        names=_txt_column_names(filepath),
+        dtype=str,
+        keep_default_na=False,
+        quoting=csv.QUOTE_NONE,
+        chunksize=chunksize
+    )
+
+
+@instrument("ingest", count_nulls=True)
 def convert_txt_to_csv(filepath: str) -> pd.DataFrame:
     """Convert a tab-delimited text file to a CSV (pandas DataFrame).
 
+    Every value is kept as the string in the file, with empty values as
+    empty strings.
+
     Parameters:
     filepath -- Filepath to txt data file
 
@@ -14,33 +109,114 @@ def convert_txt_to_csv(filepath: str) -> pd.DataFrame:
     """
     try:
 
-        with open(filepath, "r") as f:
-            data = f.readlines()
+        return _read_txt(filepath)
 
-        # Clean and split data
-        data = [re.split(r"\t|\n", line.strip()) for line in data]
+    except FileNotFoundError as e:
+        print(f"File Not Found: {e}")
+    except ValueError as e:
+        print(f"Data could not be converted to CSV: {e}")
 
-        # Extract column names and build dataframe
-        column_names = data.pop(0)
 
-        if len(column_names) < len(data[0]):
-            column_names.insert(0, "index")
+def read_txt_file_in_chunks(filepath: str, chunksize: int = 100_000):
+    """Stream a tab-delimited text file as fixed-size DataFrame chunks.
 
-        data = pd.DataFrame(data=data, columns=column_names)
+    Applies the same formatting as convert_txt_to_csv, but only holds a
+    single chunk of rows in memory at a time. A row with more values than
+    the header raises a ValueError from whichever chunk it is in.
 
-        return data
+    Parameters:
+    filepath -- Filepath to txt data file
+    chunksize -- Number of rows per yielded DataFrame
 
+    Returns:
+    A generator of Pandas DataFrames containing the data from the text file.
+    """
+    try:
+        with _read_txt(filepath, chunksize) as reader:
+            yield from reader
+
+    # Errors are raised after being reported, so a ragged row cannot
+    # silently end the stream with the rows read so far
     except FileNotFoundError as e:
         print(f"File Not Found: {e}")
+        raise
     except ValueError as e:
         print(f"Data could not be converted to CSV: {e}")
+        raise
+
+
+def _strip_namespace(tag: str) -> str:
+    """Remove any {namespace} prefix from an element tag."""
+    return tag.rsplit("}", 1)[-1]
 
 
-def convert_xml_to_csv(filepath: str) -> pd.DataFrame:
+def iterparse_xml_rows(filepath: str, batch_size: int = 50_000):
+    """Stream <row> elements from an XML file as columnar DataFrame batches.
+
+    Each row element is cleared once its values have been read, so memory is
+    bounded by the batch size rather than the size of the document. Blank
+    child values are dropped, matching convert_xml_to_csv.
+
+    Parameters:
+    filepath -- Filepath to xml data file
+    batch_size -- Number of rows per yielded DataFrame
+
+    Returns:
+    A generator of Pandas DataFrames containing the data from the xml file.
+    """
+    columns = {}
+    row_count = 0
+    root = None
+
+    for event, element in ET.iterparse(filepath, events=("start", "end")):
+        if root is None:
+            root = element
+        if event != "end" or _strip_namespace(element.tag) != "row":
+            continue
+
+        for child in element:
+            data_value = "".join(child.itertext()).strip()
+            if data_value:
+                column = columns.setdefault(_strip_namespace(child.tag), [])
+                # Back-fill rows in this batch that did not have the column
+                column.extend([np.nan] * (row_count - len(column)))
+                if len(column) > row_count:
+                    column[row_count] = data_value
+                else:
+                    column.append(data_value)
+
+        row_count += 1
+
+        # Drop the processed row, and its reference from the root element
+        element.clear()
+        root.clear()
+
+        if row_count == batch_size:
+            yield _build_xml_batch(columns, row_count)
+            columns = {}
+            row_count = 0
+
+    if row_count:
+        yield _build_xml_batch(columns, row_count)
+
+
+def _build_xml_batch(columns: dict, row_count: int) -> pd.DataFrame:
+    """Pad each column to the batch length and build a DataFrame."""
+    for values in columns.values():
+        values.extend([np.nan] * (row_count - len(values)))
+
+    return pd.DataFrame(columns, index=range(row_count))
+
+
+@instrument("ingest", count_nulls=True)
+def convert_xml_to_csv(filepath: str, parser: str = "bs4", batch_size: int = 50_000) -> pd.DataFrame:
     """Convert XML file to a CSV (pandas DataFrame).
 
     Parameters:
     filepath -- Filepath to xml data file
+    parser -- "bs4" to parse the full document with BeautifulSoup, or
+              "iterparse" to stream rows in columnar batches
+    batch_size -- Number of rows per batch when parser is "iterparse"
 
     Returns:
     A Pandas DataFrame containing the data from the xml file.
@@ -48,6 +224,17 @@ def convert_xml_to_csv(filepath: str) -> pd.DataFrame:
 
     try:
 
+        if parser == "iterparse":
+            batches = list(iterparse_xml_rows(filepath, batch_size=batch_size))
+
+            if not batches:
+                return pd.DataFrame()
+
+            return pd.concat(batches, ignore_index=True, sort=False)
+
+        if parser != "bs4":
+            raise ValueError(f"Unknown XML parser: {parser}")
+
         with open(filepath) as f:
             data = BeautifulSoup(f.read(), "xml")
 
@@ -78,20 +265,189 @@ def convert_xml_to_csv(filepath: str) -> pd.DataFrame:
         print(f"Data could not be converted to CSV: {e}")
 
 
-def convert_json_to_csv(filepath: str) -> pd.DataFrame:
+def _json_loads(decoder: str = None) -> Callable:
+    """Return the loads function of a JSON decoder."""
+    decoder = decoder or JSON_DECODER
+
+    if decoder == "orjson":
+        import orjson
+
+        return orjson.loads
+
+    return json.loads
+
+
+def _is_json_lines(filepath: str, peek_bytes: int = JSON_PEEK_BYTES) -> bool:
+    """Return whether a JSON file holds one record per line rather than a single document.
+
+    Only the start of the file is read: it is newline-delimited when its
+    first line is a complete JSON object followed by more content.
+    """
+    with open(filepath, "rb") as f:
+        head = f.read(peek_bytes)
+
+    first_line, newline, rest = head.lstrip().partition(b"\n")
+
+    if not newline or not rest.strip() or not first_line.startswith(b"{"):
+        return False
+
+    try:
+        return isinstance(json.loads(first_line), dict)
+    except ValueError:
+        return False
+
+
+def _json_index(labels: list) -> pd.Index:
+    """Return the row index of a column-oriented document from its string labels."""
+    if all(label == str(i) for i, label in enumerate(labels)):
+        return pd.RangeIndex(len(labels))
+
+    # Numeric labels are read as integers, as pd.read_json does
+    if all(label.isdigit() for label in labels):
+        return pd.Index([int(label) for label in labels])
+
+    return pd.Index(labels)
+
+
+def _read_json_columns(raw: bytes, loads: Callable) -> pd.DataFrame:
+    """Decode a document in pandas' columns orientation one column at a time.
+
+    Each column's object is decoded on its own and copied into a Series
+    before the next is decoded, so only one column is ever held as Python
+    dicts. A column ends at the first closing brace followed by the next
+    column's name that decodes as a complete object; a brace inside a
+    string never does, as the string is left unterminated.
+
+    Returns:
+    A Pandas DataFrame, or None when the document is not a plain object of
+    objects sharing the same row labels.
+    """
+    columns = {}
+    labels = None
+    position = 0
+
+    while match := _JSON_COLUMN_NAME.match(raw, position):
+        start = match.end()
+        boundaries = _JSON_COLUMN_END.finditer(raw, start)
+
+        for _ in range(JSON_COLUMN_ATTEMPTS):
+            boundary = next(boundaries, None)
+            # The last column ends at the document's closing brace
+            position = boundary.start() + 1 if boundary else raw.rindex(b"}")
+
+            try:
+                values = loads(raw[start:position])
+                break
+            except ValueError:
+                if boundary is None:
+                    return None
+        else:
+            return None
+
+        if not isinstance(values, dict):
+            return None
+
+        if labels is None:
+            labels = list(values)
+        elif list(values) != labels:
+            return None
+
+        columns[loads(match.group(1))] = pd.Series(list(values.values()))
+        del values
+
+    if not columns or raw[position:].strip() != b"}":
+        return None
+
+    dataframe = pd.DataFrame(columns)
+    dataframe.index = _json_index(labels)
+
+    return dataframe
+
+
+def _document_to_dataframe(document) -> pd.DataFrame:
+    """Build a DataFrame from a decoded JSON document, detecting its orientation.
+
+    Lists of objects are read as records and lists of lists as rows of
+    values. Objects with "columns" and "data" keys are read in pandas'
+    split orientation, any other object of objects in pandas' default
+    columns orientation and an object of values as a single record.
+    """
+    if isinstance(document, list):
+        if document and isinstance(document[0], dict):
+            return pd.DataFrame.from_records(document)
+
+        return pd.DataFrame(document)
+
+    if isinstance(document, dict):
+        if {"columns", "data"} <= set(document):
+            return pd.DataFrame(document["data"], columns=document["columns"], index=document.get("index"))
+
+        if all(isinstance(values, dict) for values in document.values()):
+            dataframe = pd.DataFrame(document)
+            dataframe.index = _json_index(list(dataframe.index))
+
+            return dataframe
+
+        # A newline-delimited file holding a single record
+        if not any(isinstance(values, (dict, list)) for values in document.values()):
+            return pd.DataFrame.from_records([document])
+
+    raise ValueError("JSON document is not a table of records, rows or columns")
+
+
+def _iter_json_lines(filepath: str, chunksize: int, loads: Callable):
+    """Yield DataFrames of chunksize records from a newline-delimited JSON file."""
+    records = []
+
+    with open(filepath, "rb") as f:
+        for line in f:
+            if line.strip():
+                records.append(loads(line))
+
+            if len(records) == chunksize:
+                yield pd.DataFrame.from_records(records)
+                records = []
+
+    if records:
+        yield pd.DataFrame.from_records(records)
+
+
+def _read_json_document(filepath: str, loads: Callable) -> pd.DataFrame:
+    """Decode a JSON document, a column at a time when it is in pandas' columns orientation."""
+    with open(filepath, "rb") as f:
+        raw = f.read()
+
+    dataframe = _read_json_columns(raw, loads)
+
+    if dataframe is None:
+        dataframe = _document_to_dataframe(loads(raw))
+
+    return dataframe
+
+
+@instrument("ingest", count_nulls=True)
+def convert_json_to_csv(filepath: str, decoder: str = None) -> pd.DataFrame:
     """Convert JSON file to a CSV (pandas DataFrame).
 
+    The orientation of the file is detected: newline-delimited records, or
+    a single document of records, rows, pandas' split orientation or
+    pandas' columns orientation. Values keep their JSON types.
+
     Parameters:
     filepath -- Filepath to JSON data file
+    decoder -- "orjson" or "json", defaults to JSON_DECODER
 
     Returns:
     A Pandas DataFrame containing the data from the JSON file.
     """
 
     try:
-        data = pd.read_json(filepath)
+        loads = _json_loads(decoder)
 
-        return data
+        if _is_json_lines(filepath):
+            return pd.concat(_iter_json_lines(filepath, JSON_LINES_CHUNK_SIZE, loads), ignore_index=True)
+
+        return _read_json_document(filepath, loads)
 
     except FileNotFoundError as e:
         print(f"File Not Found: {e}")
@@ -99,11 +455,58 @@ def convert_json_to_csv(filepath: str) -> pd.DataFrame:
         print(f"Data could not be converted to CSV: {e}")
 
 
-def convert_xlsx_to_csv(filepath: str) -> pd.DataFrame:
+def read_json_file_in_chunks(filepath: str, chunksize: int = JSON_LINES_CHUNK_SIZE, decoder: str = None):
+    """Stream a JSON file as DataFrame chunks.
+
+    Newline-delimited files are read chunksize records at a time, so only
+    a single chunk is held in memory. A single JSON document is read
+    whole, a column at a time when it is in pandas' columns orientation,
+    and yielded as one chunk. A malformed file raises a ValueError.
+
+    Parameters:
+    filepath -- Filepath to JSON data file
+    chunksize -- Number of records per yielded DataFrame of a newline-delimited file
+    decoder -- "orjson" or "json", defaults to JSON_DECODER
+
+    Returns:
+    A generator of Pandas DataFrames containing the data from the JSON file.
+    """
+    try:
+        loads = _json_loads(decoder)
+
+        if _is_json_lines(filepath):
+            yield from _iter_json_lines(filepath, chunksize, loads)
+        else:
+            yield _read_json_document(filepath, loads)
+
+    # Errors are raised after being reported, so a malformed file cannot
+    # silently end the stream with the rows read so far
+    except FileNotFoundError as e:
+        print(f"File Not Found: {e}")
+        raise
+    except ValueError as e:
+        print(f"Data could not be converted to CSV: {e}")
+        raise
+
+
+def _read_excel_sheet(filepath: str, sheet: str, engine: str, usecols: list = None) -> pd.DataFrame:
+    """Read a single sheet of an Excel workbook."""
+    return pd.read_excel(filepath, sheet_name=sheet, engine=engine, usecols=usecols)
+
+
+@instrument("ingest", count_nulls=True)
+def convert_xlsx_to_csv(filepath: str, usecols: list = None, engine: str = None, max_workers: int = None) -> pd.DataFrame:
     """Convert XLSX file to a CSV (pandas DataFrame).
 
+    Workbooks with more than one sheet have their sheets read concurrently
+    in a process pool, as parsing a sheet holds the GIL. The sheets are
+    concatenated once, in workbook order.
+
     Parameters:
     filepath -- Filepath to XLSX data file
+    usecols -- Only read these columns, e.g. CUSTOMER_COLUMNS
+    engine -- Excel engine, defaults to EXCEL_ENGINE
+    max_workers -- Maximum number of sheets read at once
 
     Returns:
     A Pandas DataFrame containing the data from the XLSX file.
@@ -111,21 +514,27 @@ def convert_xlsx_to_csv(filepath: str) -> pd.DataFrame:
 
     try:
 
-        excel_book = pd.ExcelFile(filepath)
+        engine = engine or EXCEL_ENGINE
 
-        if len(excel_book.sheet_names) > 1:
-            print("There is more than one sheet contained in the Excel file.")
+        with pd.ExcelFile(filepath, engine=engine) as excel_book:
+            sheet_names = excel_book.sheet_names
 
-        full_data = pd.DataFrame()
+        if len(sheet_names) > 1:
+            print("There is more than one sheet contained in the Excel file.")
 
-        # Iterate over sheets in Excel Book and concat into DataFrame
-        for sheet in excel_book.sheet_names:
-            data = excel_book.parse(sheet_name=sheet)
-            full_data = pd.concat([
-                full_data, data
-            ])
+            with ProcessPoolExecutor(max_workers=max_workers or min(len(sheet_names), os.cpu_count())) as executor:
+                sheets = list(executor.map(
+                    _read_excel_sheet,
+                    [filepath] * len(sheet_names),
+                    sheet_names,
+                    [engine] * len(sheet_names),
+                    [usecols] * len(sheet_names)
+                ))
+        else:
+            sheets = [_read_excel_sheet(filepath, sheet_names[0], engine, usecols)]
 
-        return full_data
+        # Concatenate the sheets once rather than growing the table per sheet
+        return pd.concat(sheets, ignore_index=True)
 
     except FileNotFoundError as e:
         print(f"File Not Found: {e}")
@@ -133,61 +542,371 @@ def convert_xlsx_to_csv(filepath: str) -> pd.DataFrame:
         print(f"Data could not be converted to CSV: {e}")
 
 
-def read_csv_file(filepath: str) -> pd.DataFrame:
+def _split_csv_line(line: str) -> list:
+    """Split a raw extract line on commas, dropping empty values."""
+    return [value.strip() for value in line.split(",") if value.strip()]
+
+
+def _align_shipping_line(line: str) -> list:
+    """Split a raw shipping extract line into its nine fields by their shape.
+
+    Empty values are kept while splitting so missing fields hold their
+    place. The customer ID and dates anchor the row: a city appended to the
+    customer ID is split off, stray empty values among the city, state and
+    country are dropped, and everything after the dates is the street
+    address, including any commas it contained.
+
+    Returns:
+    A list of id, customer ID, city, state, country, postal code, start
+    date, end date and street address, with None for missing fields.
+    """
+    aligned_row = ALIGNED_SHIPPING_ROW.match(line.rstrip("\r\n"))
+    if aligned_row:
+        return [value.strip() or None if value is not None else None for value in aligned_row.groups()]
+
+    values = [value.strip() for value in line.split(",")]
+    row = [None] * 9
+
+    if not SHIPPING_ID_SHAPE.match(values[0]):
+        return row
+
+    row[0] = values[0]
+    i = 1
+
+    # Customer ID is the first value after the ID, with the city possibly
+    # appended to it
+    while i < len(values) and not values[i]:
+        i += 1
+
+    customer_id = CUSTOMER_ID_SHAPE.match(values[i]) if i < len(values) else None
+    location = []
+
+    if customer_id:
+        row[1] = customer_id.group(1)
+        if customer_id.group(2):
+            location.append(customer_id.group(2))
+        i += 1
+
+    # City, state and country run until the postal code or start date
+    while i < len(values) and len(location) < 3 and not DATE_SHAPE.match(values[i]):
+        if POSTAL_CODE_SHAPE.match(values[i]):
+            # An empty value followed by more of the location is a stray gap
+            next_value = values[i + 1] if i + 1 < len(values) else ""
+            if values[i] or POSTAL_CODE_SHAPE.match(next_value) or DATE_SHAPE.match(next_value):
+                break
+        else:
+            location.append(values[i])
+        i += 1
+
+    row[2:2 + len(location)] = location
+
+    # The postal code is missing altogether in some rows, rather than empty
+    if i < len(values) and POSTAL_CODE_SHAPE.match(values[i]):
+        row[5] = values[i]
+        i += 1
+
+    for position in (6, 7):
+        if i < len(values) and (not values[i] or DATE_SHAPE.match(values[i])):
+            row[position] = values[i]
+            i += 1
+
+    row[8] = ", ".join(value for value in values[i:] if value)
+
+    return [value or None for value in row]
+
+
+# Splits a raw extract line into fields, by name
+TOKENIZERS = {
+    "naive": _split_csv_line,
+    "aligned": _align_shipping_line,
+}
+
+
+def _iter_csv_rows(file_object, preamble_rows: int = 6, tokenizer: str = "naive"):
+    """Yield split rows from an extract, skipping the preamble and trailer.
+
+    The final line of the extract contains extraction details, so each row
+    is held back by one line and the last one read is never yielded. The
+    header row is always split on commas, the rows after it by the tokenizer.
+    """
+    if tokenizer not in TOKENIZERS:
+        raise ValueError(f"Unknown tokenizer: {tokenizer}")
+
+    for _ in range(preamble_rows):
+        if not file_object.readline():
+            return
+
+    split_line = _split_csv_line
+    previous_line = None
+    for line in file_object:
+        if previous_line is not None:
+            yield split_line(previous_line)
+            split_line = TOKENIZERS[tokenizer]
+        previous_line = line
+
+
+@instrument("ingest", count_nulls=True)
+def read_csv_file(filepath: str, tokenizer: str = None) -> pd.DataFrame:
     """Read CSV File and Adjust Formatting.
 
     Parameters:
     filepath -- Filepath to CSV data file
+    tokenizer -- "naive" drops empty values, leaving misaligned rows to be
+    repaired when transforming; "aligned" aligns shipping fields by shape
 
     Returns:
     A Pandas DataFrame containing the data from the CSV file.
     """
     try:
         with open(filepath) as f:
-            data = [line.split(",") for line in f.readlines()]
-            data = [[value.strip() for value in line if value.strip()] for line in data]
+            rows = _iter_csv_rows(f, tokenizer=tokenizer or SHIPPING_TOKENIZER)
 
-        # Remove the last line containing extraction details
-        data.pop(-1)
+            # Column Names are the first row after the extraction details
+            column_names = next(rows)
 
-        # Iterate over initial elements and remove them as they are extraction
-        # details
-        i = 0
-        while i < 6:
-            data.pop(0)
-            i += 1
+            data = pd.DataFrame(data=list(rows), columns=column_names)
 
-        # Column Names are the first list element
-        column_names = data.pop(0)
+        return data
 
-        data = pd.DataFrame(data=data, columns=column_names)
+    except FileNotFoundError as e:
+        print(f"File Not Found: {e}")
+    except ValueError as e:
+        print(f"Data could not be converted to CSV: {e}")
 
-        return data
 
+def read_csv_file_in_chunks(filepath: str, chunksize: int = 100_000, tokenizer: str = None):
+    """Stream a CSV extract as fixed-size DataFrame chunks.
+
+    Applies the same formatting as read_csv_file, but only holds a single
+    chunk of rows in memory at a time. A row with more values than the
+    header raises a ValueError from whichever chunk it is in.
+
+    Parameters:
+    filepath -- Filepath to CSV data file
+    chunksize -- Number of rows per yielded DataFrame
+    tokenizer -- One of "naive" or "aligned", see read_csv_file
+
+    Returns:
+    A generator of Pandas DataFrames containing the data from the CSV file.
+    """
+    try:
+        with open(filepath) as f:
+            rows = _iter_csv_rows(f, tokenizer=tokenizer or SHIPPING_TOKENIZER)
+            column_names = next(rows, None)
+
+            # An extract without a header has no rows to yield
+            if column_names is None:
+                return
+
+            # Pad short rows so every chunk has the full set of columns, as a
+            # chunk may not contain any complete rows
+            chunk = []
+            for row in rows:
+                chunk.append(row + [None] * (len(column_names) - len(row)))
+                if len(chunk) == chunksize:
+                    yield pd.DataFrame(data=chunk, columns=column_names)
+                    chunk = []
+
+            if chunk:
+                yield pd.DataFrame(data=chunk, columns=column_names)
+
+    # Errors are raised after being reported, so a failing chunk cannot
+    # silently end the stream with the rows read so far
     except FileNotFoundError as e:
         print(f"File Not Found: {e}")
+        raise
     except ValueError as e:
         print(f"Data could not be converted to CSV: {e}")
+        raise
 
 
-if __name__ == "__main__":
+def write_csv_file_in_chunks(filepath: str, output_filepath: str, chunksize: int = 100_000, tokenizer: str = None) -> int:
+    """Stream a CSV extract straight to a formatted CSV file.
+
+    Parameters:
+    filepath -- Filepath to CSV data file
+    output_filepath -- Filepath the formatted CSV is written to
+    chunksize -- Number of rows held in memory at a time
+    tokenizer -- One of "naive" or "aligned", see read_csv_file
+
+    Returns:
+    The number of rows written.
+    """
+    rows_written = 0
+
+    # Chunks are written beside the output and moved over it once the whole
+    # extract has been read, so a failure leaves any earlier output intact
+    temporary_filepath = f"{output_filepath}.tmp"
+
+    try:
+        for chunk in read_csv_file_in_chunks(filepath, chunksize=chunksize, tokenizer=tokenizer):
+            chunk.to_csv(
+                temporary_filepath,
+                mode="w" if rows_written == 0 else "a",
+                header=rows_written == 0,
+                index=False
+            )
+            rows_written += len(chunk)
+    except Exception:
+        if os.path.exists(temporary_filepath):
+            os.remove(temporary_filepath)
+        raise
+
+    if rows_written == 0:
+        raise ValueError(f"{filepath} contains no rows.")
+
+    os.replace(temporary_filepath, output_filepath)
+
+    return rows_written
+
+
+def _write_converted(converter, filepath: str, table: str, data_dir: str, storage_format: str, **kwargs) -> int:
+    """Run a converter and write its DataFrame to the source layer, returning the row count."""
+    data = converter(filepath, **kwargs)
+
+    if data is None:
+        raise ValueError(f"{filepath} could not be converted to CSV.")
+
+    write_table(data, "source", table, storage_format=storage_format, data_dir=data_dir)
+
+    return len(data)
+
+
+def _write_streamed(converter, filepath: str, table: str, data_dir: str, storage_format: str, **kwargs) -> int:
+    """Stream a converter's chunks to the source layer, returning the row count."""
+    rows = write_table_chunks(
+        converter(filepath, **kwargs), "source", table, storage_format=storage_format, data_dir=data_dir
+    )
+
+    if rows == 0:
+        raise ValueError(f"{filepath} could not be converted to CSV, no rows were read.")
 
-    # Read, Convert, and Save Customer Details to CSV
-    customer_details = convert_xlsx_to_csv("data/raw/cust.xlsx")
-    customer_details.to_csv("data/source/customer_details.csv", index=False)
+    return rows
 
-    # Read, Convert, and Save Invoice Details to CSV
-    invoice_details = convert_xml_to_csv("data/raw/invoice.xml")
-    invoice_details.to_csv("data/source/invoice_details.csv", index=False)
 
-    # Read, Convert, and Save Product Details to CSV
-    product_details = convert_json_to_csv("data/raw/product.json")
-    product_details.to_csv("data/source/product_details.csv", index=False)
+# Converters yielding chunks of rows rather than a whole table
+STREAMING_CONVERTERS = (read_csv_file_in_chunks, read_json_file_in_chunks, read_txt_file_in_chunks)
+
+# Raw file, converter and converter arguments for each source table
+INGESTION_SOURCES = {
+    "customer_details": ("data/raw/cust.xlsx", convert_xlsx_to_csv, {"usecols": CUSTOMER_COLUMNS}),
+    "invoice_details": ("data/raw/invoice.xml", convert_xml_to_csv, {"parser": "iterparse"}),
+    "product_details": ("data/raw/product.json", read_json_file_in_chunks, {}),
+    "region_details": ("data/raw/regiontxt", read_txt_file_in_chunks, {}),
+    "shipping_details": ("data/raw/shippuingaddress_20240521.csv.csv", read_csv_file_in_chunks, {"tokenizer": SHIPPING_TOKENIZER}),
+}
+
+
+def ingest_source(name: str, data_dir: str = "data", storage_format: str = None, raw_dir: str = None) -> dict:
+    """Convert a single raw source and save it to the source layer.
+
+    Parameters:
+    name -- Key of the source in INGESTION_SOURCES
+    data_dir -- Root directory of the data layers
+    storage_format -- Format the source table is stored in
+    raw_dir -- Directory to read the raw file from instead of data/raw
+
+    Returns:
+    A dictionary containing the number of rows written, the wall time, the
+    bytes read and written and the peak memory of the process.
+    """
+    filepath, converter, kwargs = INGESTION_SOURCES[name]
+
+    if raw_dir is not None:
+        filepath = os.path.join(raw_dir, os.path.basename(filepath))
+
+    # The converters report and swallow missing files, so check up front
+    # to make sure the failure is attributed to this source
+    if not os.path.exists(filepath):
+        raise FileNotFoundError(f"No such file: {filepath}")
+
+    start = time.perf_counter()
+
+    with measure_memory() as memory:
+        # The shipping extract, product and region files are streamed straight to their output files
+        if converter in STREAMING_CONVERTERS:
+            rows = _write_streamed(converter, filepath, name, data_dir, storage_format, **kwargs)
+        else:
+            rows = _write_converted(converter, filepath, name, data_dir, storage_format, **kwargs)
+
+    # The converter arguments are recorded with the table, so the shipping
+    # transform knows which tokenizer read the extract
+    write_table_metadata({"raw_file": os.path.basename(filepath), **kwargs}, "source", name, data_dir)
+
+    return {
+        "rows": rows,
+        "seconds": time.perf_counter() - start,
+        "bytes_read": os.path.getsize(filepath),
+        "bytes_written": os.path.getsize(table_path("source", name, storage_format, data_dir)),
+        **memory,
+    }
+
+
+def run_ingestion(
+    sources: list = None,
+    data_dir: str = "data",
+    storage_format: str = None,
+    max_workers: int = None
+) -> dict:
+    """Convert the raw sources concurrently in a process pool.
+
+    Each source is written to the source layer as soon as it finishes. A
+    failing source is reported without affecting the others.
+
+    Parameters:
+    sources -- Names of the sources to ingest, defaults to all of them
+    data_dir -- Root directory of the data layers
+    storage_format -- Format the source tables are stored in
+    max_workers -- Maximum number of worker processes
+
+    Returns:
+    A dictionary keyed by source name containing the status, row count,
+    wall time and error (if any) of each source.
+
+    Events recorded in the worker processes are lost with them, so an event
+    is recorded here for each source from the measurements it returns.
+    """
+    sources = list(INGESTION_SOURCES) if sources is None else sources
+    results = {}
+
+    with ProcessPoolExecutor(max_workers=max_workers or len(sources)) as executor:
+        futures = {
+            executor.submit(ingest_source, name, data_dir, storage_format): (name, time.perf_counter())
+            for name in sources
+        }
+
+        for future in as_completed(futures):
+            name, submitted = futures[future]
+            try:
+                result = future.result()
+                results[name] = {"status": "success", **result, "error": None}
+                print(f"{name}: {result['rows']} rows written in {result['seconds']:.2f}s")
+                record_event(
+                    f"ingest_{name}",
+                    "ingest",
+                    seconds=result["seconds"],
+                    rows_out=result["rows"],
+                    bytes_read=result["bytes_read"],
+                    bytes_written=result["bytes_written"],
+                    rss_delta_mb=result.get("rss_delta_mb"),
+                    traced_peak_mb=result.get("traced_peak_mb")
+                )
+            except Exception as e:
+                seconds = time.perf_counter() - submitted
+                results[name] = {"status": "failed", "rows": 0, "seconds": seconds, "error": repr(e)}
+                print(f"{name}: failed after {seconds:.2f}s - {e}")
+                record_event(f"ingest_{name}", "ingest", status="failed", error=repr(e), seconds=seconds)
+
+    return results
+
+
+if __name__ == "__main__":
+
+    # Read, Convert, and Save each raw source to the source layer in parallel
+    ingestion_results = run_ingestion()
 
-    # Read, Convert, and Save Region Details to CSV
-    region_details = convert_txt_to_csv("data/raw/regiontxt")
-    region_details.to_csv("data/source/region_details.csv", index=False)
+    manifest_path = write_manifest("ingestion")
+    print(f"Run manifest written to {manifest_path}")
 
-    # Read, Convert, and Save Shipping Details to CSV
-    shipping_details = read_csv_file("data/raw/shippuingaddress_20240521.csv.csv")
-    shipping_details.to_csv("data/source/shipping_details.csv", index=False)
+    if any(result["status"] == "failed" for result in ingestion_results.values()):
+        sys.exit(1)
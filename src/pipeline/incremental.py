@@ -0,0 +1,214 @@
+import argparse
+import glob
+import os
+
+import pandas as pd
+
+from src.initial_ingestion.initial_ingestion import SHIPPING_TOKENIZER, read_csv_file
+from src.transforming.region_lookup import REGION_LOOKUP, load_region_index
+from src.transforming.shipping_transforming import transform_shipping_details
+from src.utils.instrumentation import write_manifest
+from src.utils.schemas import STAGE_COLUMNS, TABLE_SCHEMAS, cast_to_schema
+from src.utils.storage import (
+    DEFAULT_FORMAT,
+    find_table,
+    infer_csv_types,
+    list_partitions,
+    partition_path,
+    read_partitions,
+    read_table,
+    write_table
+)
+from src.utils.utils import upsert_by_key
+from src.utils.watermark import (
+    find_pending_extracts,
+    load_watermarks,
+    record_extract,
+    save_watermarks,
+    watermark_path
+)
+from src.validating.shipping_validating import validate_shipping_details
+
+
+SHIPPING_EXTRACT_PATTERN = "shippuingaddress_*.csv*"
+
+# Shipping tables are partitioned by shipping ID range, e.g. "shipping_range=000100000"
+SHIPPING_PARTITION_KEY = "shipping_range"
+
+# Shipping IDs in each partition
+SHIPPING_PARTITION_SIZE = 100_000
+
+
+def shipping_partitions(shipping_ids: pd.Series) -> pd.Series:
+    """Return the partition of each row from its shipping ID."""
+    starts = (shipping_ids // SHIPPING_PARTITION_SIZE * SHIPPING_PARTITION_SIZE).astype("int64")
+
+    return f"{SHIPPING_PARTITION_KEY}=" + starts.map("{:09d}".format)
+
+
+def partition_shipping_table(layer: str, data_dir: str = "data", storage_format: str = None) -> None:
+    """Split a shipping table written by a full run into shipping ID partitions.
+
+    A full run writes the table as a single file, which is always newer than
+    the partitions of an earlier incremental run, so it replaces them. Once
+    split, the single file is removed and the table is read from its
+    partitions.
+    """
+    try:
+        path, stored_format = find_table(layer, "shipping_details", data_dir)
+    except FileNotFoundError:
+        return
+
+    table = read_table(layer, "shipping_details", storage_format=stored_format, data_dir=data_dir)
+
+    for partition in list_partitions(layer, "shipping_details", storage_format, data_dir):
+        os.remove(partition_path(layer, "shipping_details", partition, storage_format, data_dir))
+
+    for partition, rows in table.groupby(shipping_partitions(table["shipping_id"]), sort=True):
+        write_table(rows, layer, "shipping_details", storage_format=storage_format, data_dir=data_dir, partition=partition)
+
+    os.remove(path)
+    print(f"{layer} shipping_details split into shipping ID partitions.")
+
+
+def upsert_shipping_partitions(changes: pd.DataFrame, layer: str, data_dir: str = "data", storage_format: str = None) -> list:
+    """Upsert changed rows by shipping ID, rewriting only the partitions they fall in.
+
+    Returns:
+    The partitions written.
+    """
+    stored = set(list_partitions(layer, "shipping_details", storage_format, data_dir))
+    written = []
+
+    for partition, rows in changes.groupby(shipping_partitions(changes["shipping_id"]), sort=True):
+        existing = None
+        if partition in stored:
+            existing = read_partitions(layer, "shipping_details", [partition], storage_format=storage_format, data_dir=data_dir)
+
+        write_table(
+            upsert_by_key(existing, rows, "shipping_id"),
+            layer,
+            "shipping_details",
+            storage_format=storage_format,
+            data_dir=data_dir,
+            partition=partition
+        )
+        written.append(partition)
+
+    return written
+
+
+def run_incremental_shipping(
+    raw_dir: str = "data/raw",
+    data_dir: str = "data",
+    storage_format: str = None,
+    watermark_file: str = None,
+    tokenizer: str = None
+) -> list:
+    """Process only new or changed shipping extracts and upsert them by shipping ID.
+
+    Each pending extract is read with the source schema, then transformed
+    and validated on its own. The changed rows are merged into the
+    transformed and validated shipping tables, replacing any rows with the
+    same shipping ID. The tables are stored as shipping ID partitions, and
+    only the partitions holding changed rows are read and rewritten.
+    Watermarks are saved once the tables have been written, so an
+    interrupted run processes the extracts again.
+
+    Only additions and updates are applied. When a processed extract
+    changes, rows removed from it are kept in the tables, as the rows are
+    not recorded with the extract they came from. A full run rebuilds the
+    tables without them.
+
+    Parameters:
+    raw_dir -- Directory containing the dated shipping extracts
+    data_dir -- Root directory of the data layers
+    storage_format -- Format the shipping partitions are stored in
+    watermark_file -- Path of the watermark file, defaults to watermarks.json in data_dir
+    tokenizer -- Tokenizer the extracts are read with, defaults to SHIPPING_TOKENIZER
+
+    Returns:
+    The extracts that were processed.
+    """
+    storage_format = storage_format or DEFAULT_FORMAT
+    tokenizer = tokenizer or SHIPPING_TOKENIZER
+    watermark_file = watermark_file or watermark_path(data_dir)
+
+    watermarks = load_watermarks(watermark_file)
+    extracts = glob.glob(os.path.join(raw_dir, SHIPPING_EXTRACT_PATTERN))
+    processed = set(watermarks.get("shipping_details", {}))
+    pending = find_pending_extracts("shipping_details", extracts, watermarks)
+
+    if not pending:
+        # Watermarks given a new modification time are kept, so those extracts are not hashed again
+        save_watermarks(watermarks, watermark_file)
+        print("No new or changed shipping extracts.")
+        return []
+
+    region_details = read_table(
+        "transformed",
+        "region_details",
+        STAGE_COLUMNS[("transform_shipping_details", "region_details")],
+        data_dir=data_dir
+    )
+    transformed_changes = None
+    validated_changes = None
+
+    region_index = None
+    if REGION_LOOKUP == "index":
+        region_index = load_region_index(region_details, find_table("transformed", "region_details", data_dir)[0], data_dir)
+
+    for filepath, signature in pending.items():
+        if os.path.basename(filepath) in processed:
+            print(f"{os.path.basename(filepath)} has changed since it was processed, rows removed from it are not deleted.")
+
+        source = read_csv_file(filepath, tokenizer)
+
+        if source is None:
+            raise ValueError(f"{filepath} could not be read.")
+
+        # Raw values are typed as the stored source table would be, so
+        # postal codes stay strings however few rows the extract has
+        source = cast_to_schema(source, "source", "shipping_details")
+
+        # Rows read with the aligned tokenizer are already in place
+        transformed_delta = transform_shipping_details(
+            source,
+            region_details.copy(),
+            repair_rows=tokenizer == "naive",
+            region_index=region_index
+        )
+        transformed_delta = cast_to_schema(
+            infer_csv_types(transformed_delta, stringify_dates=False, exclude=tuple(TABLE_SCHEMAS[("transformed", "shipping_details")])),
+            "transformed",
+            "shipping_details"
+        )
+        validated_delta = validate_shipping_details(transformed_delta.copy())
+
+        transformed_changes = upsert_by_key(transformed_changes, transformed_delta, "shipping_id")
+        validated_changes = upsert_by_key(validated_changes, validated_delta, "shipping_id")
+
+        record_extract(watermarks, "shipping_details", filepath, signature, rows=len(source))
+        print(f"{os.path.basename(filepath)}: {len(validated_delta)} validated rows merged.")
+
+    for layer, changes in (("transformed", transformed_changes), ("validated", validated_changes)):
+        partition_shipping_table(layer, data_dir, storage_format)
+        partitions = upsert_shipping_partitions(changes, layer, data_dir, storage_format)
+        print(f"{layer} shipping_details: {len(changes)} rows upserted into {len(partitions)} partitions.")
+
+    save_watermarks(watermarks, watermark_file)
+
+    return list(pending)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Incrementally process new shipping extracts.")
+    parser.add_argument("--raw-dir", default="data/raw")
+    parser.add_argument("--data-dir", default="data")
+    parser.add_argument("--format", choices=["csv", "parquet", "feather"])
+    args = parser.parse_args()
+
+    run_incremental_shipping(raw_dir=args.raw_dir, data_dir=args.data_dir, storage_format=args.format)
+
+    manifest_path = write_manifest("incremental_shipping", os.path.join(args.data_dir, "manifests"))
+    print(f"Run manifest written to {manifest_path}")
@@ -0,0 +1,307 @@
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from functools import partial
+from typing import Callable
+import argparse
+import os
+import sys
+import time
+
+import pandas as pd
+
+from src.initial_ingestion.initial_ingestion import (
+    CUSTOMER_COLUMNS,
+    SHIPPING_TOKENIZER,
+    convert_json_to_csv,
+    convert_txt_to_csv,
+    convert_xlsx_to_csv,
+    convert_xml_to_csv,
+    read_csv_file
+)
+from src.transforming.customer_transforming import transform_customer_details
+from src.transforming.invoice_transforming import transform_invoice_details
+from src.transforming.product_transforming import transform_product_details
+from src.transforming.region_transforming import transform_region_details
+from src.transforming.shipping_transforming import transform_shipping_details
+from src.pipeline.stage_cache import StageCache, stage_key
+from src.utils.instrumentation import write_manifest
+from src.utils.schemas import TABLE_SCHEMAS, cast_to_schema
+from src.utils.storage import LAYERS, infer_csv_types, write_table, write_table_metadata
+from src.validating.customer_validating import validate_customer_details
+from src.validating.invoice_validating import validate_invoice_details
+from src.validating.product_validating import validate_product_details
+from src.validating.region_validating import validate_region_details
+from src.validating.shipping_validating import validate_shipping_details
+
+
+@dataclass
+class Stage:
+    """A step in the pipeline.
+
+    The function is called with the outputs of the stage's dependencies, in
+    order, and returns a DataFrame for the given layer and table. The files
+    it reads and its parameters make up its cache key along with those of
+    its dependencies.
+    """
+    name: str
+    function: Callable
+    layer: str
+    table: str
+    dependencies: tuple = ()
+    input_files: tuple = ()
+    params: dict = field(default_factory=dict)
+
+
+def _ingest(converter: Callable, filepath: str, **kwargs) -> pd.DataFrame:
+    """Run a raw converter, raising if it could not produce a table."""
+    data = converter(filepath, **kwargs)
+
+    if data is None:
+        raise ValueError(f"{filepath} could not be converted.")
+
+    return data
+
+
+def _from_memory(function: Callable, layer: str, table_name: str, table: pd.DataFrame, *dependencies) -> pd.DataFrame:
+    """Run a transform or validator on a table handed over in memory.
+
+    The table is typed as it would be read back from the given layer:
+    declared columns are cast to their TABLE_SCHEMAS types and only the
+    others are inferred, so an all-digit string column stays a string.
+    Dates are handed over as datetime64 so they are not parsed again.
+    """
+    declared = tuple(TABLE_SCHEMAS.get((layer, table_name), {}))
+    table = cast_to_schema(infer_csv_types(table, stringify_dates=False, exclude=declared), layer, table_name)
+
+    return function(table, *dependencies)
+
+
+def build_stages(raw_dir: str = "data/raw", tokenizer: str = None) -> list:
+    """Build the ingestion -> transforming -> validating graph for every table.
+
+    The shipping extract is read with the given tokenizer, defaulting to
+    SHIPPING_TOKENIZER, and its rows are only repaired when it is "naive".
+    """
+    tokenizer = tokenizer or SHIPPING_TOKENIZER
+    raw_files = {
+        "customer_details": (convert_xlsx_to_csv, "cust.xlsx", {"usecols": CUSTOMER_COLUMNS}),
+        "invoice_details": (convert_xml_to_csv, "invoice.xml", {"parser": "iterparse"}),
+        "product_details": (convert_json_to_csv, "product.json", {}),
+        "region_details": (convert_txt_to_csv, "regiontxt", {}),
+        "shipping_details": (read_csv_file, "shippuingaddress_20240521.csv.csv", {"tokenizer": tokenizer}),
+    }
+    transforms = {
+        "customer_details": (transform_customer_details, ()),
+        "invoice_details": (transform_invoice_details, ()),
+        "product_details": (transform_product_details, ()),
+        "region_details": (transform_region_details, ()),
+        "shipping_details": (
+            partial(transform_shipping_details, repair_rows=tokenizer == "naive"),
+            ("transform_region_details",)
+        ),
+    }
+    validators = {
+        "customer_details": validate_customer_details,
+        "invoice_details": validate_invoice_details,
+        "product_details": validate_product_details,
+        "region_details": validate_region_details,
+        "shipping_details": validate_shipping_details,
+    }
+
+    stages = []
+    for table, (converter, filename, kwargs) in raw_files.items():
+        transform, extra_dependencies = transforms[table]
+        filepath = os.path.join(raw_dir, filename)
+        stages.extend([
+            Stage(
+                f"ingest_{table}",
+                partial(_ingest, converter, filepath, **kwargs),
+                "source",
+                table,
+                input_files=(filepath,),
+                params=kwargs
+            ),
+            Stage(
+                f"transform_{table}",
+                partial(_from_memory, transform, "source", table),
+                "transformed",
+                table,
+                (f"ingest_{table}",) + extra_dependencies
+            ),
+            Stage(
+                f"validate_{table}",
+                partial(_from_memory, validators[table], "transformed", table),
+                "validated",
+                table,
+                (f"transform_{table}",)
+            ),
+        ])
+
+    return stages
+
+
+def select_stages(stages: list, tables: list) -> list:
+    """Keep the stages for the given tables and everything they depend on."""
+    by_name = {stage.name: stage for stage in stages}
+    selected = {}
+    pending = [stage.name for stage in stages if stage.table in tables]
+
+    while pending:
+        name = pending.pop()
+        if name not in selected:
+            selected[name] = by_name[name]
+            pending.extend(by_name[name].dependencies)
+
+    return [stage for stage in stages if stage.name in selected]
+
+
+def run_pipeline(
+    stages: list,
+    persist_layers: tuple = (),
+    data_dir: str = "data",
+    storage_format: str = None,
+    max_workers: int = 4,
+    cache: StageCache = None
+) -> dict:
+    """Run the stages as a dependency graph, passing DataFrames in memory.
+
+    Stages run on a thread pool as soon as their dependencies have finished,
+    so independent tables run concurrently. When a stage fails, the stages
+    depending on it are skipped and the rest of the graph carries on.
+
+    When a cache is given, a stage whose input files, code, parameters and
+    upstream stages are unchanged since an earlier run is not run, and its
+    output is restored from the cache instead.
+
+    Parameters:
+    stages -- Stages making up the graph
+    persist_layers -- Layers whose tables are written under data_dir
+    data_dir -- Root directory of the data layers
+    storage_format -- Format persisted tables are written in
+    max_workers -- Maximum number of stages run at once
+    cache -- Stage cache to restore unchanged outputs from
+
+    Returns:
+    A dictionary keyed by stage name containing the status, wall time,
+    error, output DataFrame, cache key and whether the output came from the
+    cache for each stage.
+    """
+    by_name = {stage.name: stage for stage in stages}
+    consumers = {name: 0 for name in by_name}
+    for stage in stages:
+        for dependency in stage.dependencies:
+            consumers[dependency] += 1
+
+    results = {}
+    started = {}
+    running = {}
+
+    def run_stage(stage: Stage) -> tuple:
+        key = None
+        output = None
+
+        if cache is not None:
+            key = stage_key(
+                stage.name,
+                stage.input_files,
+                stage.params,
+                tuple(results[dependency]["cache_key"] for dependency in stage.dependencies)
+            )
+            output = cache.get(key)
+
+        cached = output is not None
+
+        if not cached:
+            # Inputs shared by several stages are copied, as the stage functions
+            # modify their inputs in place
+            inputs = [
+                results[dependency]["output"].copy() if consumers[dependency] > 1 else results[dependency]["output"]
+                for dependency in stage.dependencies
+            ]
+            output = stage.function(*inputs)
+
+            if cache is not None:
+                cache.put(key, stage.name, output)
+
+        if stage.layer in persist_layers:
+            write_table(output, stage.layer, stage.table, storage_format=storage_format, data_dir=data_dir)
+
+            # Source tables are recorded with their converter arguments, as ingestion records them
+            if stage.layer == "source":
+                raw_file = {"raw_file": os.path.basename(stage.input_files[0])} if stage.input_files else {}
+                write_table_metadata({**raw_file, **stage.params}, stage.layer, stage.table, data_dir)
+
+        return output, key, cached
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        while len(results) < len(stages):
+            for stage in stages:
+                if stage.name in results or stage.name in started:
+                    continue
+
+                statuses = [results.get(dependency, {}).get("status") for dependency in stage.dependencies]
+
+                if any(status in ("failed", "skipped") for status in statuses):
+                    results[stage.name] = {
+                        "status": "skipped", "seconds": 0.0, "error": None, "output": None, "cache_key": None, "cached": False
+                    }
+                    print(f"{stage.name}: skipped as a dependency did not complete")
+                elif all(status == "success" for status in statuses):
+                    running[executor.submit(run_stage, stage)] = stage.name
+                    started[stage.name] = time.perf_counter()
+
+            if not running:
+                continue
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+
+            for future in done:
+                name = running.pop(future)
+                seconds = time.perf_counter() - started[name]
+                try:
+                    output, key, cached = future.result()
+                    results[name] = {
+                        "status": "success", "seconds": seconds, "error": None, "output": output, "cache_key": key, "cached": cached
+                    }
+                    print(f"{name}: {'restored from cache' if cached else 'completed'} in {seconds:.2f}s")
+                except Exception as e:
+                    results[name] = {
+                        "status": "failed", "seconds": seconds, "error": repr(e), "output": None, "cache_key": None, "cached": False
+                    }
+                    print(f"{name}: failed after {seconds:.2f}s - {e}")
+
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the ETL pipeline in a single process.")
+    parser.add_argument("--tables", nargs="+", help="Tables to run, along with the stages they depend on")
+    parser.add_argument("--persist", nargs="+", choices=LAYERS, default=[], help="Layers to write to disk")
+    parser.add_argument("--format", choices=["csv", "parquet", "feather"], help="Format persisted layers are written in")
+    parser.add_argument("--max-workers", type=int, default=4)
+    parser.add_argument("--no-cache", action="store_true", help="Run every stage rather than restoring unchanged outputs")
+    args = parser.parse_args()
+
+    stage_cache = None if args.no_cache else StageCache()
+
+    pipeline_stages = build_stages()
+
+    if args.tables:
+        pipeline_stages = select_stages(pipeline_stages, args.tables)
+
+    pipeline_results = run_pipeline(
+        pipeline_stages,
+        persist_layers=tuple(args.persist),
+        storage_format=args.format,
+        max_workers=args.max_workers,
+        cache=stage_cache
+    )
+
+    if stage_cache is not None:
+        print(f"Stage cache: {stage_cache.summary()}")
+
+    manifest_path = write_manifest("pipeline")
+    print(f"Run manifest written to {manifest_path}")
+
+    if any(result["status"] != "success" for result in pipeline_results.values()):
+        sys.exit(1)
@@ -0,0 +1,255 @@
+from datetime import datetime, timezone
+from functools import lru_cache
+from importlib import metadata
+import argparse
+import glob
+import hashlib
+import json
+import os
+import platform
+import threading
+
+import numpy as np
+import pandas as pd
+
+from src.utils.watermark import file_hash
+
+
+CACHE_DIR = os.environ.get("ETL_CACHE_DIR", "data/cache")
+
+# Total size of the cached outputs kept, least recently used outputs are evicted first
+CACHE_MAX_BYTES = int(os.environ.get("ETL_CACHE_MAX_BYTES", 2 ** 30))
+
+# Directory hashed to give the code version of every stage
+CODE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Optional libraries the stages read and write with, keyed by their version when installed
+OPTIONAL_LIBRARIES = ("pyarrow", "orjson", "python-calamine", "openpyxl")
+
+# Settings that do not change a stage's output, left out of its key
+UNKEYED_SETTINGS = {
+    "ETL_CACHE_DIR",
+    "ETL_CACHE_MAX_BYTES",
+    "ETL_DUPLICATE_REPORT_DIR",
+    "ETL_INSTRUMENTATION",
+    "ETL_MANIFEST_DIR",
+}
+
+
+@lru_cache(maxsize=None)
+def code_version(code_dir: str = CODE_DIR) -> str:
+    """Return a hash of every Python source file under the code directory.
+
+    The stages share their helpers, so any change to the code changes the
+    version of every stage.
+    """
+    digest = hashlib.sha256()
+
+    for path in sorted(glob.glob(os.path.join(code_dir, "**", "*.py"), recursive=True)):
+        digest.update(os.path.relpath(path, code_dir).encode())
+        with open(path, "rb") as f:
+            digest.update(f.read())
+
+    return digest.hexdigest()
+
+
+@lru_cache(maxsize=None)
+def library_versions() -> dict:
+    """Return the versions of Python and the libraries a stage's output depends on.
+
+    An upgrade can change an output or stop an older pickle from loading, so
+    the versions are part of every key. Optional libraries that are not
+    installed have a version of None.
+    """
+    versions = {"python": platform.python_version(), "pandas": pd.__version__, "numpy": np.__version__}
+
+    for library in OPTIONAL_LIBRARIES:
+        try:
+            versions[library] = metadata.version(library)
+        except metadata.PackageNotFoundError:
+            versions[library] = None
+
+    return versions
+
+
+def pipeline_settings() -> dict:
+    """Return the ETL_ environment settings that can change a stage's output."""
+    return {name: value for name, value in sorted(os.environ.items()) if name.startswith("ETL_") and name not in UNKEYED_SETTINGS}
+
+
+def stage_key(name: str, input_files: tuple = (), params: dict = None, dependency_keys: tuple = ()) -> str:
+    """Return the content address of a stage's output.
+
+    The key covers the contents of the stage's input files, the code
+    version, the Python and library versions, the stage's parameters and
+    settings, and the keys of the stages it depends on, so a change
+    anywhere upstream changes the key.
+    """
+    return hashlib.sha256(json.dumps({
+        "stage": name,
+        "inputs": {path: file_hash(path) for path in input_files},
+        "code": code_version(),
+        "libraries": library_versions(),
+        "params": params or {},
+        "settings": pipeline_settings(),
+        "dependencies": list(dependency_keys),
+    }, sort_keys=True, default=str).encode()).hexdigest()
+
+
+class StageCache:
+    """Stage outputs stored on disk by content address.
+
+    Outputs are pickled, so every dtype, including categorical and sparse
+    one-hot columns, is restored as it was. An index of the entries is kept
+    alongside them, and the least recently used entries are evicted when
+    the total size exceeds max_bytes.
+    """
+
+    def __init__(self, cache_dir: str = CACHE_DIR, max_bytes: int = CACHE_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.index_path = os.path.join(cache_dir, "index.json")
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        os.makedirs(cache_dir, exist_ok=True)
+
+        self.index = {}
+        if os.path.exists(self.index_path):
+            with open(self.index_path) as f:
+                self.index = json.load(f)
+
+    def _entry_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.pkl")
+
+    def _save_index(self) -> None:
+        """Save the index, replacing the file in one step."""
+        temporary_path = f"{self.index_path}.tmp"
+
+        with open(temporary_path, "w") as f:
+            json.dump(self.index, f, indent=2, sort_keys=True)
+
+        os.replace(temporary_path, self.index_path)
+
+    def get(self, key: str) -> pd.DataFrame:
+        """Return the cached output for a key, or None if there is none.
+
+        An entry that cannot be read, e.g. a truncated file, is removed and
+        counted as a miss, so the stage is run again.
+        """
+        with self._lock:
+            if key not in self.index or not os.path.exists(self._entry_path(key)):
+                self.misses += 1
+                return None
+
+        try:
+            output = pd.read_pickle(self._entry_path(key))
+        except Exception as e:
+            print(f"Stage cache entry {key[:12]} could not be read and was removed - {e}")
+
+            with self._lock:
+                self.index.pop(key, None)
+                if os.path.exists(self._entry_path(key)):
+                    os.remove(self._entry_path(key))
+                self._save_index()
+                self.misses += 1
+
+            return None
+
+        with self._lock:
+            if key in self.index:
+                self.index[key]["last_used_at"] = datetime.now(timezone.utc).isoformat()
+                self._save_index()
+            self.hits += 1
+
+        return output
+
+    def put(self, key: str, stage: str, output: pd.DataFrame) -> None:
+        """Store a stage's output under its key, then evict entries over the size bound."""
+        path = self._entry_path(key)
+        temporary_path = f"{path}.tmp"
+
+        output.to_pickle(temporary_path, compression=None)
+        os.replace(temporary_path, path)
+
+        with self._lock:
+            now = datetime.now(timezone.utc).isoformat()
+            self.index[key] = {
+                "stage": stage,
+                "bytes": os.path.getsize(path),
+                "rows": len(output),
+                "created_at": now,
+                "last_used_at": now,
+            }
+            self._evict(self.max_bytes)
+            self._save_index()
+
+    def _evict(self, max_bytes: int) -> list:
+        """Remove least recently used entries until the cache fits in max_bytes."""
+        evicted = []
+        total = sum(entry["bytes"] for entry in self.index.values())
+
+        for key in sorted(self.index, key=lambda key: self.index[key]["last_used_at"]):
+            if total <= max_bytes:
+                break
+
+            total -= self.index[key]["bytes"]
+            evicted.append(key)
+            del self.index[key]
+
+            if os.path.exists(self._entry_path(key)):
+                os.remove(self._entry_path(key))
+
+        return evicted
+
+    def prune(self, max_bytes: int = None, stages: list = None) -> list:
+        """Evict entries down to max_bytes, or remove every entry of the given stages.
+
+        Returns:
+        The keys removed.
+        """
+        with self._lock:
+            if stages is not None:
+                removed = [key for key, entry in self.index.items() if entry["stage"] in stages]
+                for key in removed:
+                    del self.index[key]
+                    if os.path.exists(self._entry_path(key)):
+                        os.remove(self._entry_path(key))
+            else:
+                removed = self._evict(self.max_bytes if max_bytes is None else max_bytes)
+
+            self._save_index()
+
+        return removed
+
+    def entries(self) -> pd.DataFrame:
+        """Return the cache entries, most recently used first."""
+        entries = pd.DataFrame.from_dict(self.index, orient="index", columns=["stage", "bytes", "rows", "created_at", "last_used_at"])
+
+        return entries.rename_axis("key").sort_values("last_used_at", ascending=False)
+
+    def summary(self) -> str:
+        """Describe the cache usage of this run."""
+        total = sum(entry["bytes"] for entry in self.index.values())
+
+        return f"{self.hits} hits, {self.misses} misses, {len(self.index)} entries using {total / 2 ** 20:.1f} of {self.max_bytes / 2 ** 20:.0f} MiB"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Inspect and prune the pipeline's stage cache.")
+    parser.add_argument("command", choices=["inspect", "prune"])
+    parser.add_argument("--cache-dir", default=CACHE_DIR)
+    parser.add_argument("--max-bytes", type=int, help="Size to prune the cache down to, defaults to the configured bound")
+    parser.add_argument("--stages", nargs="+", help="Remove every entry of these stages")
+    parser.add_argument("--all", action="store_true", help="Remove every entry")
+    args = parser.parse_args()
+
+    stage_cache = StageCache(args.cache_dir)
+
+    if args.command == "inspect":
+        print(stage_cache.entries().rename(index=lambda key: key[:12]).to_string())
+        print(stage_cache.summary())
+    else:
+        removed_keys = stage_cache.prune(0 if args.all else args.max_bytes, args.stages)
+        print(f"{len(removed_keys)} entries removed. {stage_cache.summary()}")
@@ -1,7 +1,8 @@
 import pandas as pd
-import re
 
 
+from src.utils.instrumentation import instrument, write_manifest
+from src.utils.storage import read_table, write_table
 from src.utils.utils import (
     check_for_duplicates,
     check_for_missing_values,
@@ -27,12 +28,12 @@ def update_column_names(dataframe: pd.DataFrame) -> pd.DataFrame:
 
 
 def clean_customer_id(dataframe: pd.DataFrame) -> pd.DataFrame:
-    """"""
+    """Keep the two letters and number around the hyphen of each customer ID, dropping any other characters."""
     try:
-        dataframe["customer_id"] = (
-            dataframe["customer_id"]
-            .apply(lambda x: re.search(r"\w{2}-[0-9]+", x).group(0))
-        )
+        customer_ids = dataframe["customer_id"]
+
+        # IDs without that core are kept as they are
+        dataframe["customer_id"] = customer_ids.str.extract(r"(\w{2}-[0-9]+)", expand=False).fillna(customer_ids)
 
         return dataframe
 
@@ -40,11 +41,9 @@ def clean_customer_id(dataframe: pd.DataFrame) -> pd.DataFrame:
         print(f"Column not present: {e}")
 
 
-if __name__ == "__main__":
-
-    # Read Customer Details data
-    customer_details = pd.read_csv("data/source/customer_details.csv")
-
+@instrument("transform", count_nulls=True)
+def transform_customer_details(customer_details: pd.DataFrame) -> pd.DataFrame:
+    """Transform source customer details into the transformed layer."""
     # Change column names for Customer Details
     customer_details = update_column_names(customer_details)
 
@@ -56,7 +55,7 @@ if __name__ == "__main__":
         print("There are missing values in the dataset")
 
     # Check for duplicates and print if any are present
-    customer_details = check_for_duplicates(customer_details)
+    customer_details = check_for_duplicates(customer_details, "customer_details")
 
     # Convert categorical variable to one-hot encoding representation
     customer_details = one_hot_encode(customer_details, "customer_segment")
@@ -65,4 +64,17 @@ if __name__ == "__main__":
     customer_details = clean_customer_id(customer_details)
     customer_details = standardise_customer_id(customer_details)
 
-    customer_details.to_csv("data/transformed/customer_details.csv", index=False)
+    return customer_details
+
+
+if __name__ == "__main__":
+
+    # Read Customer Details data
+    customer_details = read_table("source", "customer_details")
+
+    customer_details = transform_customer_details(customer_details)
+
+    write_table(customer_details, "transformed", "customer_details")
+
+    manifest_path = write_manifest("transform_customer_details")
+    print(f"Run manifest written to {manifest_path}")
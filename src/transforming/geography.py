@@ -0,0 +1,77 @@
+import numpy as np
+import pandas as pd
+
+
+GEOGRAPHY_COLUMNS = ("city", "state", "country")
+
+# A small subset of countries are referenced more than once due to acronym
+# use, each alias is mapped to the name used by the region details
+COUNTRY_ALIASES = {
+    "US": "United States",
+    "USA": "United States",
+    "United States of America": "United States",
+    "UK": "United Kingdom",
+    "NZ": "New Zealand",
+}
+
+# Aliases for each geographic column, shared by the region and shipping transforms
+GEOGRAPHY_ALIASES = {
+    "country": COUNTRY_ALIASES,
+}
+
+# Punctuation removed from the start of each value
+LEADING_QUOTES = r"^[\"]+"
+
+# Corrections to the region details found while validating shipping
+# details, applied in order to rows matching the (country, market)
+REGION_OVERRIDES = (
+    (("Austria", "EMEA"), {"region": "Central", "market": "EU"}),
+    # Mongolia was first moved to "North Asia" and then overwritten, so only
+    # the region changes
+    (("Mongolia", "EMEA"), {"region": "APAC"}),
+)
+
+
+def canonicalise_category(series: pd.Series, aliases: dict = None) -> pd.Series:
+    """Clean a text column into a categorical, once per distinct value.
+
+    Leading quotes are stripped and aliases replaced with their canonical
+    value, so aliases share a single category. Values that are not strings
+    become missing.
+    """
+    codes, uniques = pd.factorize(series)
+
+    canonical = pd.Series(uniques, dtype=object).str.replace(LEADING_QUOTES, "", regex=True)
+    if aliases:
+        canonical = canonical.replace(aliases)
+
+    categories = pd.Index(canonical.dropna().unique())
+
+    # Missing values have a code of -1 in both the values and the categories
+    category_codes = np.append(categories.get_indexer(canonical), -1)
+
+    return pd.Series(
+        pd.Categorical.from_codes(category_codes[codes], categories),
+        index=series.index,
+        name=series.name
+    )
+
+
+def canonicalise_geography(dataframe: pd.DataFrame, columns=GEOGRAPHY_COLUMNS) -> pd.DataFrame:
+    """Store the geographic columns present in the dataframe as canonical categoricals."""
+    for column in columns:
+        if column in dataframe.columns:
+            dataframe[column] = canonicalise_category(dataframe[column], GEOGRAPHY_ALIASES.get(column))
+
+    return dataframe
+
+
+def apply_region_overrides(region_details: pd.DataFrame) -> pd.DataFrame:
+    """Apply REGION_OVERRIDES to the region details."""
+    for (country, market), updates in REGION_OVERRIDES:
+        matches = (region_details["country"] == country) & (region_details["market"] == market)
+
+        for column, value in updates.items():
+            region_details.loc[matches, column] = value
+
+    return region_details
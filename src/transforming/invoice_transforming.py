@@ -1,5 +1,24 @@
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import argparse
+import os
+import sys
+import tempfile
+import time
+
 import pandas as pd
 
+from src.utils.dates import parse_dates
+from src.utils.instrumentation import instrument, measure_memory, record_event, write_manifest
+from src.utils.schemas import read_csv_typed
+from src.utils.storage import (
+    FILE_EXTENSIONS,
+    list_partitions,
+    partition_path,
+    read_table,
+    read_table_chunks,
+    table_path,
+    write_table
+)
 from src.utils.utils import (
     check_for_duplicates,
     check_for_missing_values,
@@ -9,6 +28,15 @@ from src.utils.utils import (
 )
 
 
+ONE_HOT_COLUMNS = ["ship_mode", "order_priority"]
+
+# Invoices are partitioned by the month of their order date, e.g. "order_month=2011-01"
+PARTITION_KEY = "order_month"
+
+# Source rows read at a time while the source is split into partitions
+PARTITION_CHUNK_SIZE = 100_000
+
+
 def round_float_values(dataframe: pd.DataFrame, column: str) -> pd.DataFrame:
     """Round Numeric Columns to 2 Digit Places"""
     dataframe[column] = dataframe[column].round(2)
@@ -16,9 +44,9 @@ def round_float_values(dataframe: pd.DataFrame, column: str) -> pd.DataFrame:
     return dataframe
 
 
-if __name__ == "__main__":
-    invoice_details = pd.read_csv("data/source/invoice_details.csv")
-
+@instrument("transform", count_nulls=True)
+def transform_invoice_details(invoice_details: pd.DataFrame, duplicate_report: str = "invoice_details") -> pd.DataFrame:
+    """Transform source invoice details into the transformed layer."""
     # Column names are using snake case, but are in title format so transform to lower
     invoice_details.columns = invoice_details.columns.str.lower()
 
@@ -27,8 +55,7 @@ if __name__ == "__main__":
     invoice_details = standardise_date_format(invoice_details, "ship_date")
 
     # Convert Categorical variables to one-hot encoding
-    invoice_details = one_hot_encode(invoice_details, "ship_mode")
-    invoice_details = one_hot_encode(invoice_details, "order_priority")
+    invoice_details = one_hot_encode(invoice_details, ONE_HOT_COLUMNS)
 
     # Round Sale values to 2 digits to ensure consistency
     invoice_details = round_float_values(invoice_details, "sale_value")
@@ -47,6 +74,179 @@ if __name__ == "__main__":
         print("There are missing values in the dataset")
 
     # Check for duplicates and print if any are present
-    invoice_details = check_for_duplicates(invoice_details)
+    invoice_details = check_for_duplicates(invoice_details, duplicate_report)
+
+    return invoice_details
+
+
+def order_month_partitions(order_dates: pd.Series) -> pd.Series:
+    """Return the partition of each invoice from its source order date."""
+    months = parse_dates(order_dates, "%d/%m/%Y").dt.strftime("%Y-%m").fillna("unknown")
+
+    return f"{PARTITION_KEY}=" + months
+
+
+def partition_invoice_source(spill_dir: str, data_dir: str = "data", chunksize: int = PARTITION_CHUNK_SIZE) -> dict:
+    """Split the source invoice details into a CSV per order month, reading a chunk at a time.
+
+    Returns:
+    A dictionary of the sorted categories of each one-hot column across the
+    whole table.
+    """
+    categories = {column: set() for column in ONE_HOT_COLUMNS}
+    written = set()
+
+    for chunk in read_table_chunks("source", "invoice_details", chunksize, data_dir):
+        for column in chunk.columns:
+            if column.lower() in categories:
+                categories[column.lower()].update(chunk[column].dropna().unique())
+
+        for partition, rows in chunk.groupby(order_month_partitions(chunk["Order_Date"]), sort=False):
+            rows.to_csv(os.path.join(spill_dir, f"{partition}.csv"), mode="a", header=partition not in written, index=False)
+            written.add(partition)
+
+    return {column: sorted(values) for column, values in categories.items()}
+
+
+def transform_invoice_partition(
+    spill_path: str,
+    partition: str,
+    categories: dict,
+    data_dir: str = "data",
+    storage_format: str = None
+) -> dict:
+    """Transform one partition of the source invoice details and write it to the transformed layer.
+
+    The one-hot columns are given the categories of the whole table, so
+    every partition has the same one-hot columns.
+
+    Returns:
+    A dictionary containing the rows read and written, the wall time and
+    the memory used by the partition, as measured by measure_memory.
+    """
+    start = time.perf_counter()
+
+    with measure_memory() as memory:
+        invoice_details = read_csv_typed(spill_path, "source", "invoice_details")
+        rows_in = len(invoice_details)
+
+        for column in invoice_details.columns:
+            if column.lower() in categories:
+                invoice_details[column] = pd.Categorical(invoice_details[column], categories=categories[column.lower()])
+
+        invoice_details = transform_invoice_details(invoice_details, duplicate_report=f"invoice_details_{partition}")
+
+        write_table(invoice_details, "transformed", "invoice_details", storage_format=storage_format, data_dir=data_dir, partition=partition)
+
+    return {
+        "rows_in": rows_in,
+        "rows": len(invoice_details),
+        "seconds": time.perf_counter() - start,
+        **memory,
+    }
+
+
+def run_partitioned_invoice_transform(
+    data_dir: str = "data",
+    storage_format: str = None,
+    chunksize: int = PARTITION_CHUNK_SIZE,
+    max_workers: int = None
+) -> dict:
+    """Transform the invoice details one order month at a time in a process pool.
+
+    The source is split into a temporary CSV per month, read a chunk at a
+    time, so only a single month has to fit in a worker's memory. Each month
+    is written as a partition of the transformed table, replacing the
+    partitions of any earlier run, and can be read on its own with
+    read_partitions. A single-file table from an earlier run without
+    partitions is removed, as read_table would otherwise read it instead
+    of the partitions.
+
+    Duplicates are only removed within a partition, which finds every
+    duplicate: duplicated rows share their order date, so they always fall
+    in the same month.
+
+    Parameters:
+    data_dir -- Root directory of the data layers
+    storage_format -- Format the partitions are written in
+    chunksize -- Source rows read at a time while splitting the source
+    max_workers -- Maximum number of worker processes
+
+    Returns:
+    A dictionary keyed by partition containing the status, row counts,
+    wall time and error (if any) of each partition.
+    """
+    results = {}
+
+    with tempfile.TemporaryDirectory(dir=data_dir) as spill_dir:
+        categories = partition_invoice_source(spill_dir, data_dir, chunksize)
+        partitions = sorted(name[:-len(".csv")] for name in os.listdir(spill_dir))
+
+        for partition in list_partitions("transformed", "invoice_details", storage_format, data_dir):
+            os.remove(partition_path("transformed", "invoice_details", partition, storage_format, data_dir))
+
+        for stored_format in FILE_EXTENSIONS:
+            single_file = table_path("transformed", "invoice_details", stored_format, data_dir)
+            if os.path.exists(single_file):
+                os.remove(single_file)
+                print(f"{single_file} removed, the transformed invoice details are now read from their partitions.")
+
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            futures = {
+                executor.submit(
+                    transform_invoice_partition,
+                    os.path.join(spill_dir, f"{partition}.csv"),
+                    partition,
+                    categories,
+                    data_dir,
+                    storage_format
+                ): (partition, time.perf_counter())
+                for partition in partitions
+            }
+
+            for future in as_completed(futures):
+                partition, submitted = futures[future]
+                try:
+                    result = future.result()
+                    results[partition] = {"status": "success", **result, "error": None}
+                    record_event(
+                        f"transform_invoice_details/{partition}",
+                        "transform",
+                        seconds=result["seconds"],
+                        rows_in=result["rows_in"],
+                        rows_out=result["rows"],
+                        rss_delta_mb=result.get("rss_delta_mb"),
+                        traced_peak_mb=result.get("traced_peak_mb")
+                    )
+                except Exception as e:
+                    seconds = time.perf_counter() - submitted
+                    results[partition] = {"status": "failed", "rows": 0, "seconds": seconds, "error": repr(e)}
+                    print(f"{partition}: failed after {seconds:.2f}s - {e}")
+                    record_event(f"transform_invoice_details/{partition}", "transform", status="failed", error=repr(e), seconds=seconds)
+
+    print(f"{len(partitions)} invoice partitions transformed, {sum(result['rows'] for result in results.values())} rows written")
+
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Transform the source invoice details.")
+    parser.add_argument("--partitioned", action="store_true", help="Transform and write each order month separately in a process pool")
+    parser.add_argument("--chunksize", type=int, default=PARTITION_CHUNK_SIZE)
+    parser.add_argument("--max-workers", type=int)
+    args = parser.parse_args()
+
+    if args.partitioned:
+        partition_results = run_partitioned_invoice_transform(chunksize=args.chunksize, max_workers=args.max_workers)
+    else:
+        invoice_details = read_table("source", "invoice_details")
+
+        invoice_details = transform_invoice_details(invoice_details)
+
+        write_table(invoice_details, "transformed", "invoice_details")
+
+    manifest_path = write_manifest("transform_invoice_details")
+    print(f"Run manifest written to {manifest_path}")
 
-    invoice_details.to_csv("data/transformed/invoice_details.csv", index=False)
+    if args.partitioned and any(result["status"] == "failed" for result in partition_results.values()):
+        sys.exit(1)
@@ -1,5 +1,7 @@
 import pandas as pd
 
+from src.utils.instrumentation import instrument, write_manifest
+from src.utils.storage import read_table, write_table
 from src.utils.utils import (
     check_for_duplicates,
     check_for_missing_values,
@@ -7,16 +9,15 @@ from src.utils.utils import (
 )
 
 
-if __name__ == "__main__":
-    product_details = pd.read_csv("data/source/product_details.csv")
-
+@instrument("transform", count_nulls=True)
+def transform_product_details(product_details: pd.DataFrame) -> pd.DataFrame:
+    """Transform source product details into the transformed layer."""
     product_details.columns = [
         column_name.replace("-", "_").lower()
         for column_name in product_details.columns
     ]
 
-    product_details = one_hot_encode(product_details, "category")
-    product_details = one_hot_encode(product_details, "sub_category")
+    product_details = one_hot_encode(product_details, ["category", "sub_category"])
 
     # Check whether missing values are present in the data
     missing_values = check_for_missing_values(product_details)
@@ -26,6 +27,17 @@ if __name__ == "__main__":
         print("There are missing values in the dataset")
 
     # Check for duplicates and print if any are present
-    product_details = check_for_duplicates(product_details)
+    product_details = check_for_duplicates(product_details, "product_details")
+
+    return product_details
+
+
+if __name__ == "__main__":
+    product_details = read_table("source", "product_details")
+
+    product_details = transform_product_details(product_details)
+
+    write_table(product_details, "transformed", "product_details")
 
-    product_details.to_csv("data/transformed/product_details.csv", index=False)
+    manifest_path = write_manifest("transform_product_details")
+    print(f"Run manifest written to {manifest_path}")
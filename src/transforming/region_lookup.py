@@ -0,0 +1,103 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+
+# How region IDs are assigned to shipping rows when not given, e.g.
+# ETL_REGION_LOOKUP=index
+REGION_LOOKUP = os.environ.get("ETL_REGION_LOOKUP", "merge")
+
+# Name of the cached region index, kept in the root directory of the data layers
+REGION_INDEX_FILENAME = "region_index.json"
+
+REGION_KEY = ["state", "country"]
+
+# Reason codes recorded with each region assignment
+EXACT_MATCH = "exact"
+AMBIGUOUS_MATCH = "ambiguous_lowest_region_id"
+NO_MATCH = "unmatched"
+
+
+def region_index_path(data_dir: str = "data") -> str:
+    """Return the path of the cached region index of a data directory."""
+    return os.path.join(data_dir, REGION_INDEX_FILENAME)
+
+
+def file_signature(path: str) -> dict:
+    """Return the path, size and modification time of a file, which change whenever it is rewritten."""
+    stat = os.stat(path)
+
+    return {"path": path, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def build_region_index(region_details: pd.DataFrame) -> dict:
+    """Build a (state, country) -> region ID index from the transformed region details.
+
+    A key with more than one region ID resolves to the lowest one, so the
+    result does not depend on the order of the region table.
+
+    Returns:
+    A dictionary containing one [state, country, region ID, reason] entry
+    per key.
+    """
+    regions = region_details[REGION_KEY + ["region_id"]].dropna().sort_values(REGION_KEY + ["region_id"])
+    ambiguous = regions.duplicated(REGION_KEY, keep=False)
+    first = ~regions.duplicated(REGION_KEY)
+
+    reasons = np.where(ambiguous[first], AMBIGUOUS_MATCH, EXACT_MATCH)
+    entries = [
+        [state, country, int(region_id), reason]
+        for (state, country, region_id), reason in zip(regions.loc[first].itertuples(index=False), reasons)
+    ]
+
+    return {"entries": entries}
+
+
+def load_region_index(region_details: pd.DataFrame, region_path: str, data_dir: str = "data") -> dict:
+    """Load the region index cached in data_dir, rebuilding it if the region details have changed.
+
+    region_path is the stored table region_details was read from. The
+    cache is keyed on its size and modification time, so the region
+    details are not hashed on every load.
+    """
+    path = region_index_path(data_dir)
+    signature = file_signature(region_path)
+
+    if os.path.exists(path):
+        with open(path) as f:
+            index = json.load(f)
+
+        if index.get("region_details") == signature:
+            return index
+
+    index = {"region_details": signature, **build_region_index(region_details)}
+
+    # Replace the cached index in one step
+    temporary_path = f"{path}.tmp"
+    with open(temporary_path, "w") as f:
+        json.dump(index, f)
+    os.replace(temporary_path, path)
+
+    return index
+
+
+def assign_region_ids(dataframe: pd.DataFrame, index: dict) -> pd.DataFrame:
+    """Add region_id and region_match columns by probing the region index once per row.
+
+    Every row keeps a single region ID, so no rows are added. region_match
+    holds the reason code for the assignment.
+    """
+    entries = index["entries"]
+    keys = pd.MultiIndex.from_arrays(
+        [[state for state, _, _, _ in entries], [country for _, country, _, _ in entries]],
+        names=REGION_KEY
+    )
+    region_ids = np.array([region_id for _, _, region_id, _ in entries] + [np.nan], dtype=float)
+    reasons = np.array([reason for _, _, _, reason in entries] + [NO_MATCH], dtype=object)
+
+    # Keys that are not in the index have a position of -1, the missing entry
+    positions = keys.get_indexer(pd.MultiIndex.from_frame(dataframe[REGION_KEY]))
+
+    return dataframe.assign(region_id=region_ids[positions], region_match=reasons[positions])
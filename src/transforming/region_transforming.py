@@ -1,15 +1,19 @@
 import pandas as pd
 
 
+from src.transforming.geography import apply_region_overrides, canonicalise_geography
+from src.utils.deduplication import find_duplicates
+from src.utils.instrumentation import instrument, write_manifest
+from src.utils.storage import read_table, write_table
 from src.utils.utils import (
     check_for_duplicates,
     check_for_missing_values
 )
 
 
-if __name__ == "__main__":
-    region_details = pd.read_csv("data/source/region_details.csv")
-
+@instrument("transform", count_nulls=True)
+def transform_region_details(region_details: pd.DataFrame) -> pd.DataFrame:
+    """Transform source region details into the transformed layer."""
     region_details = region_details.drop(columns="index")
 
     region_details.columns = region_details.columns.str.lower()
@@ -17,16 +21,15 @@ if __name__ == "__main__":
     # Check whether missing values are present in the data
     missing_values = check_for_missing_values(region_details)
 
+    # Use the same canonical states and countries as the shipping details
+    region_details = canonicalise_geography(region_details)
+
     # Following the validation of Shipping details, Austria and Mongolia
     # are associated with the incorrect region. Updating here.
+    region_details = apply_region_overrides(region_details)
 
-    region_details.loc[(region_details["country"] == "Austria") & (region_details["market"] == "EMEA"), "region"] = "Central"
-    region_details.loc[(region_details["country"] == "Austria") & (region_details["market"] == "EMEA"), "market"] = "EU"
-
-    region_details.loc[(region_details["country"] == "Mongolia") & (region_details["market"] == "EMEA"), "region"] = "North Asia"
-    region_details.loc[(region_details["country"] == "Mongolia") & (region_details["market"] == "EMEA"), "region"] = "APAC"
-
-    region_duplicates = region_details.loc[region_details[["state", "country", "market", "region"]].duplicated(), "region_id"]
+    keep, _ = find_duplicates(region_details, ["state", "country", "market", "region"])
+    region_duplicates = region_details.loc[~keep, "region_id"]
 
     region_details = region_details.loc[~region_details["region_id"].isin(region_duplicates)]
 
@@ -35,6 +38,17 @@ if __name__ == "__main__":
         print("There are missing values in the dataset")
 
     # Check for duplicates and print if any are present
-    region_details = check_for_duplicates(region_details)
+    region_details = check_for_duplicates(region_details, "region_details")
+
+    return region_details
+
+
+if __name__ == "__main__":
+    region_details = read_table("source", "region_details")
+
+    region_details = transform_region_details(region_details)
+
+    write_table(region_details, "transformed", "region_details")
 
-    region_details.to_csv("data/transformed/region_details.csv", index=False)
+    manifest_path = write_manifest("transform_region_details")
+    print(f"Run manifest written to {manifest_path}")
@@ -0,0 +1,193 @@
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+
+# Pattern identifying customer IDs with the city appended, e.g. "AB-123Paris"
+MERGED_CUSTOMER_ID = r"[A-Z]{2}-[0-9]+(?=[A-Z])+"
+
+# Columns whose values are inspected while realigning a row
+SHAPE_COLUMNS = ("country", "postal_code", "effective_start", "effective_end")
+
+# Shape of a value: each feature is one bit of the row's signature
+SHAPE_FEATURES = {
+    "slash": r"/",
+    "letter": r"[A-Za-z]",
+    "upper": r"[A-Z]",
+    "digit": r"[0-9](?!/)",
+    "suite": r"^Suite",
+}
+
+REPAIRED_COLUMNS = (
+    "customer_id", "city", "state", "country", "postal_code", "effective_start", "effective_end", "street_address"
+)
+
+# Missing value markers, kept distinct as each step of the original repair
+# filled cells differently
+SHIFTED = ("missing", None)
+MISSING = ("missing", pd.NA)
+UNALIGNED = ("missing", np.nan)
+
+
+def _match_distinct(series: pd.Series, patterns: list) -> list:
+    """Search each distinct value of a series for each pattern, returning a boolean array per pattern."""
+    codes, uniques = pd.factorize(series)
+    uniques = pd.Series(uniques, dtype=object)
+    matches = []
+
+    for pattern in patterns:
+        # Missing values have a code of -1 and match no pattern
+        unique_matches = np.append(uniques.str.contains(pattern, regex=True, na=False).to_numpy(dtype=bool), False)
+        matches.append(unique_matches[codes])
+
+    return matches
+
+
+def classify_row_shapes(dataframe: pd.DataFrame) -> pd.Series:
+    """Classify the shape of every row as an integer signature.
+
+    Each feature in SHAPE_FEATURES is computed once per distinct value of
+    each column in SHAPE_COLUMNS and mapped back to the rows. The lowest bit
+    flags customer IDs with the city appended.
+    """
+    (merged_customer_id,) = _match_distinct(dataframe["customer_id"], [MERGED_CUSTOMER_ID])
+    signature = merged_customer_id.astype(np.int64)
+    bit = 1
+
+    for column in SHAPE_COLUMNS:
+        for matches in _match_distinct(dataframe[column], list(SHAPE_FEATURES.values())):
+            signature |= matches.astype(np.int64) << bit
+            bit += 1
+
+    return pd.Series(signature, index=dataframe.index)
+
+
+def _has_feature(signature: int, token: tuple, feature: str) -> bool:
+    """Return whether the value a token refers to has a shape feature."""
+    if token[0] != "column":
+        return False
+
+    position = SHAPE_COLUMNS.index(token[1]) * len(SHAPE_FEATURES) + list(SHAPE_FEATURES).index(feature)
+
+    return bool(signature >> (position + 1) & 1)
+
+
+def _shift(row: dict, columns: list) -> None:
+    """Shift the values in the columns one place to the right."""
+    for i in range(len(columns) - 1, 0, -1):
+        row[columns[i]] = row[columns[i - 1]]
+
+    row[columns[0]] = SHIFTED
+
+
+@lru_cache(maxsize=None)
+def compile_realignment(signature: int) -> tuple:
+    """Work out where each repaired column takes its value from for a row shape.
+
+    The realignment steps are replayed on tokens naming the original
+    columns, so every row with the same signature is realigned in one step.
+
+    Returns:
+    A tuple of (column, token) pairs, where a token is ("column", name),
+    ("missing", value), ("customer_id_part", i) or ("join", first, second).
+    """
+    row = {column: ("column", column) for column in REPAIRED_COLUMNS}
+
+    def has(column: str, feature: str) -> bool:
+        return _has_feature(signature, row[column], feature)
+
+    # Split the city from the customer ID, moving the remaining fields back
+    # into place
+    if signature & 1:
+        if has("postal_code", "letter"):
+            row["street_address"] = row["postal_code"]
+            row["postal_code"] = MISSING
+
+        _shift(row, ["city", "state", "country", "postal_code", "effective_start"])
+
+        if has("postal_code", "slash"):
+            _shift(row, ["postal_code", "effective_start", "effective_end"])
+
+        row["city"] = ("customer_id_part", 1)
+        row["customer_id"] = ("customer_id_part", 0)
+
+    # Addresses split across the two date columns are joined back together.
+    # All other addresses are cleared at this point and recovered below.
+    if has("effective_end", "suite"):
+        row["street_address"] = ("join", row["effective_start"], row["effective_end"])
+        row["effective_end"] = MISSING
+    else:
+        row["street_address"] = UNALIGNED
+
+    # Dates in the postal code and start columns with an address at the end
+    if has("postal_code", "slash") and has("effective_start", "slash") and has("effective_end", "upper"):
+        _shift(row, ["postal_code", "effective_start", "effective_end", "street_address"])
+
+    # A date in the start column with an address at the end
+    if has("postal_code", "digit") and has("effective_start", "slash") and has("effective_end", "upper"):
+        row["street_address"] = row["effective_end"]
+        row["effective_end"] = MISSING
+
+    # A date in the postal code column with an address in the start column
+    if has("postal_code", "slash") and has("effective_start", "upper"):
+        row["street_address"] = row["effective_start"]
+        row["effective_start"] = row["postal_code"]
+        row["postal_code"] = MISSING
+
+    # Any remaining dates in the postal code column
+    if has("postal_code", "slash"):
+        _shift(row, ["postal_code", "effective_start", "effective_end"])
+
+    return tuple(row.items())
+
+
+def _evaluate(token: tuple, positions: np.ndarray, columns: dict, customer_id_parts: tuple) -> object:
+    """Return the values a token refers to for the rows at the given positions."""
+    kind = token[0]
+
+    if kind == "column":
+        return columns[token[1]][positions]
+    if kind == "missing":
+        return token[1]
+    if kind == "customer_id_part":
+        return customer_id_parts[token[1]][positions]
+
+    first = pd.Series(_evaluate(token[1], positions, columns, customer_id_parts), dtype=object)
+    second = pd.Series(_evaluate(token[2], positions, columns, customer_id_parts), dtype=object)
+
+    return (first + " " + second).to_numpy()
+
+
+def repair_shipping_rows(shipping_details: pd.DataFrame) -> pd.DataFrame:
+    """Realign shipping rows whose fields were shifted into the wrong columns.
+
+    Every row is classified by the shape of its fields in a single pass, and
+    each group of rows with the same shape is realigned at once. Rows whose
+    customer ID contained the city are placed after the other rows.
+    """
+    signatures = classify_row_shapes(shipping_details).to_numpy()
+    merged_customer_id = (signatures & 1).astype(bool)
+
+    # Customer ID and city parts of the merged IDs, aligned to every row
+    parts = shipping_details.loc[merged_customer_id, "customer_id"].str.split(r"[0-9](?=[A-Z])", regex=True)
+    customer_id_parts = tuple(np.empty(len(shipping_details), dtype=object) for _ in range(2))
+    for i, values in enumerate(customer_id_parts):
+        values[merged_customer_id] = parts.str[i].to_numpy()
+
+    originals = {column: shipping_details[column].to_numpy(dtype=object) for column in REPAIRED_COLUMNS}
+    repaired = {column: values.copy() for column, values in originals.items()}
+
+    codes, unique_signatures = pd.factorize(signatures)
+    for code, signature in enumerate(unique_signatures):
+        positions = np.flatnonzero(codes == code)
+
+        for column, token in compile_realignment(int(signature)):
+            if token != ("column", column):
+                repaired[column][positions] = _evaluate(token, positions, originals, customer_id_parts)
+
+    repaired_details = shipping_details.assign(**repaired)
+
+    order = np.concatenate([np.flatnonzero(~merged_customer_id), np.flatnonzero(merged_customer_id)])
+
+    return repaired_details.iloc[order]
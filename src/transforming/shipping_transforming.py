@@ -1,6 +1,12 @@
 import pandas as pd
 
 
+from src.transforming.geography import canonicalise_geography
+from src.transforming.region_lookup import REGION_LOOKUP, assign_region_ids, build_region_index, load_region_index
+from src.transforming.shipping_repair import repair_shipping_rows
+from src.utils.instrumentation import instrument, write_manifest
+from src.utils.schemas import STAGE_COLUMNS
+from src.utils.storage import find_table, read_table, read_table_metadata, write_table
 from src.utils.utils import (
     check_for_duplicates,
     check_for_missing_values,
@@ -9,13 +15,30 @@ from src.utils.utils import (
 )
 
 
-def identify_slash_in_post_code(dataframe: pd.DataFrame) -> pd.Series:
-    """Check dataframe rows for postal codes that contain a date"""
-    return dataframe["postal_code"].str.contains(r"/", regex=True, na=False)
+@instrument("transform", count_nulls=True)
+def transform_shipping_details(
+    shipping_details: pd.DataFrame,
+    region_details: pd.DataFrame,
+    repair_rows: bool = True,
+    region_lookup: str = None,
+    region_index: dict = None
+) -> pd.DataFrame:
+    """Transform source shipping details into the transformed layer.
 
+    Region IDs are added from the transformed region details. Misaligned
+    rows are repaired unless repair_rows is False, which it should be for
+    extracts read with the aligned tokenizer, see shipping_tokenizer.
 
-if __name__ == "__main__":
-    shipping_details = pd.read_csv("data/source/shipping_details.csv")
+    region_lookup is "merge" to join every region matching a row's state
+    and country, duplicating the row, or "index" to assign a single region
+    from the region index along with a region_match reason code. The index
+    is built from region_details unless region_index is given, e.g. by
+    load_region_index for region details read from disk.
+    """
+    region_lookup = region_lookup or REGION_LOOKUP
+
+    if region_lookup not in ("merge", "index"):
+        raise ValueError(f"Unknown region lookup: {region_lookup}")
 
     shipping_details = shipping_details.loc[shipping_details["id"].notna()]
 
@@ -29,126 +52,17 @@ if __name__ == "__main__":
         }
     )
 
-    # Fix Customer ID Column --------------------
-
-    # Subset data to identify customer IDs that do not follow the standard conversion (AB-123)
-    incorrect_customer_id = (
-        shipping_details.loc[shipping_details["customer_id"].str.contains("[A-Z]{2}-[0-9]+(?=[A-Z])+", regex=True)]
-    )
-
-    # Split customer ID into customer ID and city based on whether letters are found after the numbers
-    incorrect_customer_id.loc[:, "customer_id"] = incorrect_customer_id["customer_id"].str.split(r"[0-9](?=[A-Z])", regex=True)
-
-    # Boolean logic to idenitfy whether postal code contains letters
-    post_code_address = incorrect_customer_id["postal_code"].str.contains(r"[A-Za-z]", regex=True, na=False)
-
-    # Update street address with postal code where postal code contains letters
-    incorrect_customer_id.loc[post_code_address, "street_address"] = incorrect_customer_id.loc[:, "postal_code"]
-    incorrect_customer_id.loc[post_code_address, "postal_code"] = pd.NA
-
-    # Shift values in columns by 1 place to align values
-    incorrect_customer_id.loc[:, ["city", "state", "country", "postal_code", "effective_start"]] = (
-        incorrect_customer_id[["city", "state", "country", "postal_code", "effective_start"]]
-        .shift(axis=1)
-    )
-
-    # Identify rows where a date is contained in the postal code (presence of slash)
-    slash_in_postal_code = identify_slash_in_post_code(incorrect_customer_id)
-
-    # For rows with slash in postal code, shift column subset by 1
-    incorrect_customer_id.loc[slash_in_postal_code, ["postal_code", "effective_start", "effective_end"]] = (
-            incorrect_customer_id.loc[slash_in_postal_code, ["postal_code", "effective_start", "effective_end"]]
-            .shift(axis=1)
-        )
-
-    # Assign split customer ID and city to respective columns
-    incorrect_customer_id.loc[:, "city"] = incorrect_customer_id["customer_id"].apply(lambda x: x[1])
-    incorrect_customer_id.loc[:, "customer_id"] = incorrect_customer_id["customer_id"].apply(lambda x: x[0])
-
-    # Replace Data in main table with corrected customer ID data
-
-    shipping_details = shipping_details.drop(index=incorrect_customer_id.index)
-
-    shipping_details = pd.concat([
-        shipping_details, incorrect_customer_id
-    ])
-
-    # Fix Remaining Data ------------------------
-
-    # There is an instance of an address being split across the two date (start and end) columns
-    # This identifies the row and joins the strings together
-    suite_end_date = shipping_details["effective_end"].str.startswith("Suite", na=False)
-
-    shipping_details.loc[:, "street_address"] = (
-        shipping_details
-        .loc[suite_end_date]
-        .apply(lambda x: " ".join([x["effective_start"], x["effective_end"]]), axis=1)
-    )
-
-    shipping_details.loc[suite_end_date, "effective_end"] = pd.NA  # Replace suite with NA
+    # Realign rows whose fields were shifted into the wrong columns, including
+    # customer IDs with the city appended. Rows read with the aligned
+    # tokenizer are already in place.
+    if repair_rows:
+        shipping_details = repair_shipping_rows(shipping_details)
 
-    # Identify rows where postal code and effective start have dates, but effective end has an address
-    rows_with_slash_and_letter = (
-        (shipping_details["postal_code"].str.contains(r"/", regex=True, na=False)) &
-        (shipping_details["effective_start"].str.contains(r"/", regex=True, na=False)) &
-        (shipping_details["effective_end"].str.contains(r"[A-Z]", regex=True, na=False))
-    )
-
-    # Shift details along one column to align with correct headings
-    shipping_details.loc[rows_with_slash_and_letter, ["postal_code", "effective_start", "effective_end", "street_address"]] = (
-        shipping_details.loc[
-            rows_with_slash_and_letter,
-            ["postal_code", "effective_start", "effective_end", "street_address"]].shift(axis=1)
-    )
+        # Remaining address in Postal Code column
+        address_in_postal_code = shipping_details["postal_code"].str.contains(r"[A-Za-z]", regex=True, na=False)
 
-    # Identify rows without a date in postal code, but a date in effective start and address in effective end
-    rows_without_slash_and_with_letter = (
-        (shipping_details["postal_code"].str.contains(r"[0-9](?!/)", regex=True, na=False)) &
-        (shipping_details["effective_start"].str.contains(r"/", regex=True, na=False)) &
-        (shipping_details["effective_end"].str.contains(r"[A-Z]", regex=True, na=False))
-    )
-
-    # Shift address from effective end column into street address column
-    shipping_details.loc[rows_without_slash_and_with_letter, "street_address"] = (
-        shipping_details.loc[
-            rows_without_slash_and_with_letter,
-            "effective_end"]
-    )
-
-    # Replace any address with NA in the effective end column
-    shipping_details.loc[rows_without_slash_and_with_letter, "effective_end"] = pd.NA
-
-    # Identify rows with a slash in postal code and address in effective start
-    rows_with_slash_and_with_letter = (
-        (shipping_details["postal_code"].str.contains(r"/", regex=True, na=False)) &
-        (shipping_details["effective_start"].str.contains(r"[A-Z]", regex=True, na=False))
-    )
-
-    # Shift address from effective start column into street address column
-    shipping_details.loc[rows_with_slash_and_with_letter, "street_address"] = (
-        shipping_details.loc[
-            rows_with_slash_and_with_letter,
-            "effective_start"]
-    )
-
-    # Shift date in postal code to effective start column
-    shipping_details.loc[rows_with_slash_and_with_letter, "effective_start"] = (
-        shipping_details.loc[
-            rows_with_slash_and_with_letter,
-            "postal_code"]
-    )
-
-    # Replace any dates in postal code with NA
-    shipping_details.loc[rows_with_slash_and_with_letter, "postal_code"] = pd.NA
-
-    # Identify dates in postal code column
-    slash_in_postal_code = identify_slash_in_post_code(shipping_details)
-
-    # Shift columns to the right for rows where postal code still contains a date
-    shipping_details.loc[slash_in_postal_code, ["postal_code", "effective_start", "effective_end"]] = (
-        shipping_details.loc[slash_in_postal_code, ["postal_code", "effective_start", "effective_end"]]
-        .shift(axis=1)
-    )
+        shipping_details.loc[address_in_postal_code, "street_address"] = shipping_details.loc[address_in_postal_code, "postal_code"]
+        shipping_details.loc[address_in_postal_code, "postal_code"] = pd.NA
 
     # Standardise Customer ID to algin with other Tables
     shipping_details = standardise_customer_id(shipping_details)
@@ -160,15 +74,9 @@ if __name__ == "__main__":
     shipping_details["effective_start"] = shipping_details["effective_start"].str.replace(r"[\"\']+", "", regex=True)  # Remove punctuation from anywhere
     shipping_details["effective_end"] = shipping_details["effective_end"].str.replace(r"[\"\']+", "", regex=True)
 
-    shipping_details["city"] = shipping_details["city"].str.replace(r"^[\"]+", "", regex=True)  # Remove punctuation from start only
-    shipping_details["state"] = shipping_details["state"].str.replace(r"^[\"]+", "", regex=True)
-    shipping_details["country"] = shipping_details["country"].str.replace(r"^[\"]+", "", regex=True)
-
-    # Remaining address in Postal Code column
-    address_in_postal_code = shipping_details["postal_code"].str.contains(r"[A-Za-z]", regex=True, na=False)
-
-    shipping_details.loc[address_in_postal_code, "street_address"] = shipping_details.loc[address_in_postal_code, "postal_code"]
-    shipping_details.loc[address_in_postal_code, "postal_code"] = pd.NA
+    # Remove punctuation from the start of geographic columns and replace
+    # country aliases, storing each as a categorical
+    shipping_details = canonicalise_geography(shipping_details)
 
     # Convert date columns to actual date object
     shipping_details = standardise_date_format(shipping_details, "effective_start")
@@ -177,15 +85,8 @@ if __name__ == "__main__":
     # Replace missing values with NA
     shipping_details.loc[shipping_details["postal_code"].isna(), "postal_code"] = pd.NA
 
-    # Update Country Details
-    # A small subset of countries are referenced more than once due to acronym use.
-    # To ensure alignment with shipping, they are changed here.
-    shipping_details.loc[shipping_details["country"].isin(["US", "USA", "United States of America"]), "country"] = "United States"
-    shipping_details.loc[shipping_details["country"].isin(["UK"]), "country"] = "United Kingdom"
-    shipping_details.loc[shipping_details["country"].isin(["NZ"]), "country"] = "New Zealand"
-
     # Check and remove duplicates
-    shipping_details = check_for_duplicates(shipping_details)
+    shipping_details = check_for_duplicates(shipping_details, "shipping_details")
 
     # Check whether missing values are present in the data
     missing_values = check_for_missing_values(shipping_details)
@@ -196,7 +97,13 @@ if __name__ == "__main__":
         print(missing_values)
 
     # Add Region Code
-    region_details = pd.read_csv("data/transformed/region_details.csv")
+    if region_lookup == "index":
+        shipping_details = assign_region_ids(shipping_details, region_index or build_region_index(region_details))
+
+        # Each row keeps a single region, so duplicated IDs come from the extract itself
+        shipping_details.loc[shipping_details["shipping_id"].duplicated(keep=False), "is_duplicated_shipping_id"] = 1
+
+        return shipping_details
 
     region_details = region_details[["state", "country", "region_id"]]
 
@@ -209,4 +116,35 @@ if __name__ == "__main__":
     # Flag rows where shipping ID is duplicated
     shipping_details.loc[shipping_details["shipping_id"].isin(duplicated_shipping_id), "is_duplicated_shipping_id"] = 1
 
-    shipping_details.to_csv("data/transformed/shipping_details.csv", index=False)
+    return shipping_details
+
+
+def shipping_tokenizer(data_dir: str = "data") -> str:
+    """Return the tokenizer the stored source shipping details were read with.
+
+    Tables ingested before the tokenizer was recorded were read with the
+    naive tokenizer.
+    """
+    return read_table_metadata("source", "shipping_details", data_dir).get("tokenizer", "naive")
+
+
+if __name__ == "__main__":
+    shipping_details = read_table("source", "shipping_details")
+    region_details = read_table("transformed", "region_details", STAGE_COLUMNS[("transform_shipping_details", "region_details")])
+
+    # The region index is cached beside the data layers for the stored region details
+    region_index = None
+    if REGION_LOOKUP == "index":
+        region_index = load_region_index(region_details, find_table("transformed", "region_details")[0])
+
+    shipping_details = transform_shipping_details(
+        shipping_details,
+        region_details,
+        repair_rows=shipping_tokenizer() == "naive",
+        region_index=region_index
+    )
+
+    write_table(shipping_details, "transformed", "shipping_details")
+
+    manifest_path = write_manifest("transform_shipping_details")
+    print(f"Run manifest written to {manifest_path}")
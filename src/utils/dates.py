@@ -0,0 +1,67 @@
+import threading
+
+import pandas as pd
+
+
+# Formats tried, in order, when a column's format is not declared
+DATE_FORMATS = ("%d/%m/%Y", "%Y-%m-%d", "%Y-%m-%d %H:%M:%S")
+
+# Number of distinct values checked when detecting a column's format
+DETECTION_SAMPLE_SIZE = 100
+
+# Maximum number of parsed values kept per format across calls
+DATE_CACHE_SIZE = 100_000
+
+# Parsed dates by format and string value, shared by every date column
+_parsed_dates = {}
+_cache_lock = threading.Lock()
+
+
+def detect_date_format(series: pd.Series, formats: tuple = DATE_FORMATS) -> str:
+    """Return the first format that parses a sample of the distinct values in a column.
+
+    Raises a ValueError if none of the formats parse the sample.
+    """
+    sample = pd.Series(series.dropna().unique()[:DETECTION_SAMPLE_SIZE], dtype=object)
+
+    for date_format in formats:
+        try:
+            pd.to_datetime(sample, format=date_format)
+            return date_format
+        except (TypeError, ValueError):
+            continue
+
+    raise ValueError(f"{series.name} does not match any of the date formats {formats}")
+
+
+def parse_dates(series: pd.Series, date_format: str = None) -> pd.Series:
+    """Parse a column of date strings into datetime64, once per distinct value.
+
+    Columns that are already datetime64 are returned as they are, so dates
+    parsed by the transforms are not parsed again by the validators. The
+    format is detected when not given. Values seen in earlier calls with
+    the same format are taken from a cache, and the remaining distinct
+    values are parsed together. Missing values become NaT.
+    """
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return series
+
+    date_format = date_format or detect_date_format(series)
+    codes, uniques = pd.factorize(series)
+
+    with _cache_lock:
+        cache = _parsed_dates.setdefault(date_format, {})
+        unparsed = [value for value in uniques if value not in cache]
+
+        if len(cache) + len(unparsed) > DATE_CACHE_SIZE:
+            cache.clear()
+            unparsed = list(uniques)
+
+        if unparsed:
+            parsed = pd.to_datetime(pd.Series(unparsed, dtype=object), format=date_format)
+            cache.update(zip(unparsed, parsed))
+
+        # Missing values have a code of -1, the final entry
+        dates = pd.DatetimeIndex([cache[value] for value in uniques] + [pd.NaT])
+
+    return pd.Series(dates.take(codes), index=series.index, name=series.name)
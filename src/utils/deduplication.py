@@ -0,0 +1,234 @@
+from typing import Callable
+import json
+import os
+import pickle
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+
+# Directory duplicate reports are written to, e.g. ETL_DUPLICATE_REPORT_DIR=reports
+DUPLICATE_REPORT_DIR = os.environ.get("ETL_DUPLICATE_REPORT_DIR", "data/reports")
+
+# Number of duplicated rows written to each report
+DUPLICATE_SAMPLE_SIZE = 20
+
+# Number of fingerprint partitions spilled to disk by the partitioned mode
+DEDUP_PARTITIONS = 16
+
+# Number of values checked when deciding whether a column's values repeat
+CARDINALITY_SAMPLE_SIZE = 10_000
+
+FINGERPRINT_MULTIPLIER = np.uint64(1_000_003)
+
+
+def _hash_column(series: pd.Series) -> np.ndarray:
+    """Hash the values of a column, hashing repeated strings once."""
+    # Factorizing first only pays off when values repeat, so it is decided
+    # from a sample. Either way the hashes are the same.
+    categorize = False
+    if series.dtype == object:
+        sample = series.iloc[:CARDINALITY_SAMPLE_SIZE]
+        categorize = sample.nunique(dropna=False) < len(sample) / 2
+
+    return pd.util.hash_pandas_object(series, index=False, categorize=categorize).to_numpy()
+
+
+def row_fingerprints(dataframe: pd.DataFrame, columns: list = None) -> np.ndarray:
+    """Hash each row, or the given columns of each row, into a 64-bit fingerprint."""
+    columns = dataframe.columns if columns is None else list(columns)
+    fingerprints = np.zeros(len(dataframe), dtype=np.uint64)
+
+    # Column hashes are combined in order, wrapping around on overflow
+    for column in columns:
+        fingerprints = (fingerprints * FINGERPRINT_MULTIPLIER) ^ _hash_column(dataframe[column])
+
+    return fingerprints
+
+
+def find_duplicates(dataframe: pd.DataFrame, columns: list = None) -> tuple:
+    """Find rows repeating an earlier row, or an earlier row's columns.
+
+    Every row is hashed once. Rows sharing a fingerprint with another row
+    are the only candidates, and are compared on their values so that a
+    fingerprint collision cannot drop a row.
+
+    Parameters:
+    dataframe -- Table to check
+    columns -- Only compare these columns, defaults to every column
+
+    Returns:
+    A tuple of a boolean array that is True for the first occurrence of each
+    row, matching ~dataframe.duplicated(columns), and a dictionary of
+    duplicate statistics.
+    """
+    fingerprints = pd.Series(row_fingerprints(dataframe, columns))
+    candidates = fingerprints.duplicated(keep=False).to_numpy()
+
+    keep = np.ones(len(dataframe), dtype=bool)
+    if candidates.any():
+        keep[candidates] = ~dataframe.loc[candidates].duplicated(subset=columns).to_numpy()
+
+    duplicated_fingerprints = fingerprints[~keep]
+
+    return keep, {
+        "rows": len(dataframe),
+        "unique_rows": int(keep.sum()),
+        "duplicate_rows": int((~keep).sum()),
+        "duplicate_groups": int(duplicated_fingerprints.nunique()),
+        "columns": list(columns) if columns is not None else None,
+    }
+
+
+def write_duplicate_report(
+    dataframe: pd.DataFrame,
+    keep: np.ndarray,
+    stats: dict,
+    name: str,
+    report_dir: str = None,
+    sample_size: int = DUPLICATE_SAMPLE_SIZE
+) -> str:
+    """Write duplicate statistics and a sample of the duplicated rows to a JSON report.
+
+    Returns:
+    The path of the report.
+    """
+    report_dir = report_dir or DUPLICATE_REPORT_DIR
+    os.makedirs(report_dir, exist_ok=True)
+    path = os.path.join(report_dir, f"{name}_duplicates.json")
+
+    sample = dataframe.loc[~keep].head(sample_size)
+    temporary_path = f"{path}.tmp"
+
+    with open(temporary_path, "w") as f:
+        json.dump({
+            "table": name,
+            **stats,
+            "sample_index": [str(index) for index in sample.index],
+            "sample": json.loads(sample.to_json(orient="records", date_format="iso")),
+        }, f, indent=2)
+
+    os.replace(temporary_path, path)
+
+    return path
+
+
+
+def _spill_partitions(read_chunks: Callable, columns: list, paths: list) -> int:
+    """Spill the rows of each chunk to the partition files by fingerprint, returning the number of rows read."""
+    rows = 0
+    files = [open(path, "wb") for path in paths]
+
+    try:
+        for chunk in read_chunks():
+            row_numbers = np.arange(rows, rows + len(chunk))
+            fingerprints = row_fingerprints(chunk, columns)
+            values = chunk if columns is None else chunk[list(columns)]
+
+            partition = fingerprints % np.uint64(len(paths))
+            for i in np.unique(partition):
+                in_partition = partition == i
+                pickle.dump(
+                    (row_numbers[in_partition], fingerprints[in_partition], values.loc[in_partition].reset_index(drop=True)),
+                    files[i],
+                    protocol=pickle.HIGHEST_PROTOCOL
+                )
+
+            rows += len(chunk)
+    finally:
+        for f in files:
+            f.close()
+
+    return rows
+
+
+def _load_partition(path: str) -> tuple:
+    """Load the row numbers, fingerprints and values spilled to a partition file."""
+    row_numbers, fingerprints, values = [], [], []
+
+    with open(path, "rb") as f:
+        while True:
+            try:
+                spilled = pickle.load(f)
+            except EOFError:
+                break
+
+            row_numbers.append(spilled[0])
+            fingerprints.append(spilled[1])
+            values.append(spilled[2])
+
+    if not values:
+        return np.array([], dtype=np.int64), np.array([], dtype=np.uint64), pd.DataFrame()
+
+    return np.concatenate(row_numbers), np.concatenate(fingerprints), pd.concat(values, ignore_index=True)
+
+
+def find_duplicates_partitioned(
+    read_chunks: Callable,
+    columns: list = None,
+    partitions: int = DEDUP_PARTITIONS,
+    spill_dir: str = None
+) -> tuple:
+    """Find duplicated rows of a table read in chunks, for tables larger than memory.
+
+    Each chunk is fingerprinted and its rows are spilled to partition files
+    by fingerprint, along with their row numbers, so equal rows land in the
+    same partition. Partitions are then checked one at a time, so only one
+    partition has to fit in memory. As in find_duplicates, rows sharing a
+    fingerprint are compared on their values, so a fingerprint collision
+    cannot drop a row.
+
+    Equal values only share a fingerprint when they have the same dtype, so
+    the chunks should be typed consistently, e.g. by read_table_chunks.
+
+    Parameters:
+    read_chunks -- Called with no arguments, returns an iterable of DataFrame chunks
+    columns -- Only compare these columns, defaults to every column
+    partitions -- Number of partition files
+    spill_dir -- Directory the partition files are written under
+
+    Returns:
+    A tuple of the sorted row numbers repeating an earlier row and a
+    dictionary of duplicate statistics.
+    """
+    duplicate_rows = []
+    duplicate_groups = 0
+
+    with tempfile.TemporaryDirectory(dir=spill_dir) as temporary_dir:
+        paths = [os.path.join(temporary_dir, f"partition_{i}.pkl") for i in range(partitions)]
+        rows = _spill_partitions(read_chunks, columns, paths)
+
+        for path in paths:
+            # Chunks are spilled in order, so each partition is ordered by row
+            row_numbers, fingerprints, values = _load_partition(path)
+            candidates = pd.Series(fingerprints).duplicated(keep=False).to_numpy()
+
+            if not candidates.any():
+                continue
+
+            candidate_values = values.loc[candidates]
+            repeated = candidate_values.duplicated().to_numpy()
+            duplicate_rows.append(row_numbers[candidates][repeated])
+            duplicate_groups += int((candidate_values.duplicated(keep=False).to_numpy() & ~repeated).sum())
+
+    duplicate_rows = np.sort(np.concatenate(duplicate_rows)) if duplicate_rows else np.array([], dtype=np.int64)
+
+    return duplicate_rows, {
+        "rows": rows,
+        "unique_rows": rows - len(duplicate_rows),
+        "duplicate_rows": len(duplicate_rows),
+        "duplicate_groups": duplicate_groups,
+        "columns": list(columns) if columns is not None else None,
+    }
+
+
+def drop_duplicate_rows(read_chunks: Callable, duplicate_rows: np.ndarray):
+    """Yield the chunks of a table without the given row numbers, keeping their order."""
+    rows = 0
+
+    for chunk in read_chunks():
+        row_numbers = np.arange(rows, rows + len(chunk))
+        rows += len(chunk)
+
+        yield chunk.loc[~np.isin(row_numbers, duplicate_rows)]
@@ -0,0 +1,225 @@
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from functools import wraps
+import json
+import os
+import resource
+import sys
+import threading
+import time
+import tracemalloc
+
+import pandas as pd
+
+
+# Set ETL_INSTRUMENTATION=off to call instrumented functions directly
+INSTRUMENTATION = os.environ.get("ETL_INSTRUMENTATION", "on")
+
+MANIFEST_DIR = os.environ.get("ETL_MANIFEST_DIR", "data/manifests")
+
+# How the memory of each stage is measured. "rss" records the change in
+# resident set size. "tracemalloc" also records the peak memory the stage
+# allocated, but slows allocation-heavy stages several times over, e.g.
+# ETL_MEMORY_TRACING=tracemalloc
+MEMORY_TRACING = os.environ.get("ETL_MEMORY_TRACING", "rss")
+
+_events = []
+_events_lock = threading.Lock()
+_run_started_at = datetime.now(timezone.utc)
+
+# Allocated memory at the start of each stage being traced, and the peak
+# reached since, as [start, peak] in bytes
+_active_traces = []
+_traces_lock = threading.Lock()
+
+
+def process_peak_rss_mb() -> float:
+    """Return the highest resident set size this process has reached so far, in MiB."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    # Reported in bytes on macOS and kilobytes on Linux
+    return peak / 2 ** 20 if sys.platform == "darwin" else peak / 2 ** 10
+
+
+def current_rss_mb() -> float:
+    """Return the resident set size of this process in MiB, or None where /proc is not available."""
+    try:
+        with open("/proc/self/statm") as f:
+            resident_pages = int(f.read().split()[1])
+    except (OSError, IndexError, ValueError):
+        return None
+
+    return resident_pages * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+
+
+@contextmanager
+def measure_memory():
+    """Measure the memory used by the code run inside the block.
+
+    Yields a dictionary that is filled in when the block finishes.
+    rss_delta_mb is the change in resident set size. When MEMORY_TRACING is
+    "tracemalloc", traced_peak_mb is the peak memory allocated above what
+    was allocated at the start. Blocks can be nested. Memory is measured
+    for the whole process, so stages running in other threads at the same
+    time are included.
+    """
+    measurements = {}
+    rss_before = current_rss_mb()
+    trace = None
+
+    if MEMORY_TRACING == "tracemalloc":
+        with _traces_lock:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+
+            current, peak = tracemalloc.get_traced_memory()
+
+            # The peak is reset for this block, so the blocks already running
+            # keep the peak reached so far
+            for active_trace in _active_traces:
+                active_trace[1] = max(active_trace[1], peak)
+
+            tracemalloc.reset_peak()
+            trace = [current, current]
+            _active_traces.append(trace)
+
+    try:
+        yield measurements
+    finally:
+        if trace is not None:
+            with _traces_lock:
+                trace[1] = max(trace[1], tracemalloc.get_traced_memory()[1])
+                _active_traces.remove(trace)
+
+                for active_trace in _active_traces:
+                    active_trace[1] = max(active_trace[1], trace[1])
+
+            measurements["traced_peak_mb"] = (trace[1] - trace[0]) / 2 ** 20
+
+        rss_after = current_rss_mb()
+        if rss_before is not None and rss_after is not None:
+            measurements["rss_delta_mb"] = rss_after - rss_before
+
+
+def record_event(stage: str, kind: str, **measurements) -> dict:
+    """Record a structured event for a step of the run.
+
+    Measurements not given are left as None, so every event has the same
+    fields in the manifest.
+    """
+    event = {
+        "stage": stage,
+        "kind": kind,
+        "status": "success",
+        "error": None,
+        "seconds": None,
+        "rows_in": None,
+        "rows_out": None,
+        "bytes_read": None,
+        "bytes_written": None,
+        "rss_delta_mb": None,
+        "traced_peak_mb": None,
+        "null_counts": None,
+        **measurements,
+    }
+
+    with _events_lock:
+        _events.append(event)
+
+    return event
+
+
+def null_counts(dataframe: pd.DataFrame) -> dict:
+    """Return the number of missing values in each column that has any."""
+    counts = dataframe.isna().sum()
+
+    return {str(column): int(count) for column, count in counts[counts > 0].items()}
+
+
+def instrument(kind: str, count_nulls: bool = False):
+    """Decorator recording an event each time a step is called.
+
+    The first argument is taken as the step's input: its row count when it
+    is a DataFrame, or its size on disk when it is a file path. The row
+    count of a DataFrame result is recorded as the output, along with its
+    null counts when count_nulls is True. The step's memory is measured
+    with measure_memory.
+    """
+    def decorator(function):
+        if INSTRUMENTATION == "off":
+            return function
+
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            source = args[0] if args else None
+            measurements = {}
+
+            if isinstance(source, pd.DataFrame):
+                measurements["rows_in"] = len(source)
+            elif isinstance(source, str) and os.path.isfile(source):
+                measurements["bytes_read"] = os.path.getsize(source)
+
+            start = time.perf_counter()
+            try:
+                with measure_memory() as memory:
+                    result = function(*args, **kwargs)
+            except Exception as e:
+                record_event(
+                    function.__name__,
+                    kind,
+                    status="failed",
+                    error=repr(e),
+                    seconds=time.perf_counter() - start,
+                    **measurements,
+                    **memory
+                )
+                raise
+
+            measurements["seconds"] = time.perf_counter() - start
+            measurements.update(memory)
+
+            if isinstance(result, pd.DataFrame):
+                measurements["rows_out"] = len(result)
+                if count_nulls:
+                    measurements["null_counts"] = null_counts(result)
+
+            record_event(function.__name__, kind, **measurements)
+
+            return result
+
+        return wrapper
+
+    return decorator
+
+
+def run_events() -> list:
+    """Return a copy of the events recorded so far."""
+    with _events_lock:
+        return list(_events)
+
+
+def write_manifest(name: str = "run", manifest_dir: str = None) -> str:
+    """Write the events recorded in this run to a JSON manifest.
+
+    Returns:
+    The path of the manifest.
+    """
+    manifest_dir = manifest_dir or MANIFEST_DIR
+    finished_at = datetime.now(timezone.utc)
+    events = run_events()
+
+    os.makedirs(manifest_dir, exist_ok=True)
+    path = os.path.join(manifest_dir, f"{name}_{finished_at.strftime('%Y%m%dT%H%M%S%fZ')}.json")
+
+    with open(path, "w") as f:
+        json.dump({
+            "name": name,
+            "started_at": _run_started_at.isoformat(timespec="seconds"),
+            "finished_at": finished_at.isoformat(timespec="seconds"),
+            "seconds": (finished_at - _run_started_at).total_seconds(),
+            "process_peak_rss_mb": process_peak_rss_mb(),
+            "failed_stages": [event["stage"] for event in events if event["status"] == "failed"],
+            "events": events,
+        }, f, indent=2)
+
+    return path
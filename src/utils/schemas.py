@@ -0,0 +1,243 @@
+import csv
+import importlib.util
+import os
+
+import numpy as np
+import pandas as pd
+
+
+# Parser used for typed CSV reads, pyarrow when it is installed, e.g. ETL_CSV_ENGINE=c
+CSV_ENGINE = os.environ.get("ETL_CSV_ENGINE", "pyarrow" if importlib.util.find_spec("pyarrow") else "c")
+
+# Values read as missing, the same as pd.read_csv's defaults
+NA_VALUES = [
+    "", "#N/A", "#N/A N/A", "#NA", "-1.#IND", "-1.#QNAN", "-NaN", "-nan", "1.#IND", "1.#QNAN",
+    "<NA>", "N/A", "NA", "NULL", "NaN", "None", "n/a", "nan", "null",
+]
+
+# Types of the columns of each stored table, by layer and table. "str" and
+# "date" columns are never scanned for numbers, dates are parsed as they are
+# read, "nullable_int" columns are integers with missing values and columns
+# not listed, such as one-hot columns, are inferred.
+_INVOICE_TYPES = {
+    "order_id": "str",
+    "line_no": "int",
+    "customer_id": "str",
+    "product_id": "str",
+    "sale_value": "float",
+    "quantity": "int",
+    "discount": "float",
+    "profit": "float",
+    "shipping_cost": "float",
+}
+
+_TRANSFORMED_INVOICE_TYPES = {**_INVOICE_TYPES, "order_date": "date", "ship_date": "date"}
+
+_TRANSFORMED_SHIPPING_TYPES = {
+    "shipping_id": "int",
+    "customer_id": "str",
+    "city": "str",
+    "state": "str",
+    "country": "str",
+    "postal_code": "nullable_int",
+    "effective_start": "date",
+    "effective_end": "date",
+    "street_address": "str",
+    "region_id": "float",
+    "region_match": "str",
+    "is_duplicated_shipping_id": "float",
+}
+
+_TRANSFORMED_REGION_TYPES = {"region_id": "int", "state": "str", "country": "str", "market": "str", "region": "str"}
+
+TABLE_SCHEMAS = {
+    ("source", "customer_details"): {"cusid": "str", "cusnm": "str", "sgmnt": "str"},
+    ("source", "invoice_details"): {
+        "Order_ID": "str",
+        "Line_No": "int",
+        "Order_Date": "str",
+        "Ship_Date": "str",
+        "Ship_Mode": "str",
+        "Customer_ID": "str",
+        "Product_ID": "str",
+        "Sale_Value": "float",
+        "Quantity": "int",
+        "Discount": "float",
+        "Profit": "float",
+        "Shipping_Cost": "float",
+        "Order_Priority": "str",
+    },
+    ("source", "product_details"): {"Product_ID": "str", "Category": "str", "Sub-Category": "str", "Product_Name": "str"},
+    ("source", "region_details"): {
+        "index": "int", "Region_ID": "int", "State": "str", "Country": "str", "Market": "str", "Region": "str"
+    },
+    # Shipping dates keep the quotes found in the extract until they are transformed
+    ("source", "shipping_details"): {
+        "id": "float",
+        "customerid": "str",
+        "city": "str",
+        "state": "str",
+        "country": "str",
+        "postal_code": "str",
+        "effstart": "str",
+        "effend": "str",
+        "streetadd": "str",
+    },
+    ("transformed", "customer_details"): {"customer_id": "str", "customer_name": "str"},
+    ("transformed", "invoice_details"): _TRANSFORMED_INVOICE_TYPES,
+    ("transformed", "product_details"): {"product_id": "str", "product_name": "str"},
+    ("transformed", "region_details"): _TRANSFORMED_REGION_TYPES,
+    ("transformed", "shipping_details"): _TRANSFORMED_SHIPPING_TYPES,
+    ("validated", "customer_details"): {"customer_id": "str", "customer_name": "str"},
+    ("validated", "invoice_details"): _TRANSFORMED_INVOICE_TYPES,
+    ("validated", "product_details"): {"product_id": "str", "product_name": "str"},
+    ("validated", "region_details"): _TRANSFORMED_REGION_TYPES,
+    ("validated", "shipping_details"): {**_TRANSFORMED_SHIPPING_TYPES, "duplicate_reason": "str"},
+}
+
+# Columns each stage reads from the tables it depends on, when it does not need all of them
+STAGE_COLUMNS = {
+    ("transform_shipping_details", "region_details"): ["region_id", "state", "country"],
+}
+
+_PANDAS_TYPES = {"str": object, "int": "int64", "nullable_int": "Int64", "float": "float64"}
+
+
+def pandas_dtypes(layer: str, table: str) -> dict:
+    """Return the pd.read_csv dtypes of a table's declared string and numeric columns."""
+    schema = TABLE_SCHEMAS.get((layer, table), {})
+
+    return {column: _PANDAS_TYPES[kind] for column, kind in schema.items() if kind in _PANDAS_TYPES}
+
+
+def csv_read_options(layer: str, table: str, columns: list) -> dict:
+    """Return the pd.read_csv arguments that give the given columns of a table their declared types."""
+    schema = TABLE_SCHEMAS.get((layer, table), {})
+
+    return {
+        "usecols": columns,
+        "dtype": {column: dtype for column, dtype in pandas_dtypes(layer, table).items() if column in columns},
+        "parse_dates": [column for column, kind in schema.items() if kind == "date" and column in columns],
+        "date_format": "ISO8601",
+    }
+
+
+def read_header(filepath: str) -> list:
+    """Return the column names in the first line of a CSV."""
+    with open(filepath, newline="") as f:
+        return next(csv.reader(f), [])
+
+
+def _read_csv_pyarrow(filepath: str, schema: dict, columns: list) -> pd.DataFrame:
+    import pyarrow as pa
+    from pyarrow import csv as pa_csv
+
+    arrow_types = {
+        "str": pa.string(),
+        "int": pa.int64(),
+        "nullable_int": pa.int64(),
+        "float": pa.float64(),
+        "date": pa.timestamp("ns"),
+    }
+
+    table = pa_csv.read_csv(
+        filepath,
+        convert_options=pa_csv.ConvertOptions(
+            column_types={column: arrow_types[kind] for column, kind in schema.items() if column in columns},
+            include_columns=columns,
+            null_values=NA_VALUES,
+            strings_can_be_null=True,
+            quoted_strings_can_be_null=True
+        )
+    )
+    dataframe = table.to_pandas()
+
+    # Arrow gives missing strings as None, pd.read_csv gives NaN
+    for column in table.column_names:
+        values = table.column(column)
+        if pa.types.is_string(values.type) and values.null_count:
+            strings = dataframe[column].to_numpy(copy=True)
+            strings[values.is_null().to_numpy(zero_copy_only=False)] = np.nan
+            dataframe[column] = strings
+
+        # Integer columns with missing values come back as floats
+        if schema.get(column) == "nullable_int":
+            dataframe[column] = dataframe[column].astype("Int64")
+
+    return dataframe
+
+
+def cast_to_schema(dataframe: pd.DataFrame, layer: str, table: str) -> pd.DataFrame:
+    """Give a table that was not read from a CSV the column types declared in TABLE_SCHEMAS.
+
+    Used for raw rows of strings and for stored Parquet and Feather tables,
+    so they are typed as read_csv_typed would type the same table: values
+    a CSV read treats as missing become missing and declared columns are
+    cast to their types. Columns that are not declared, or whose values do
+    not fit their declared type, are kept as they are.
+    """
+    schema = TABLE_SCHEMAS.get((layer, table), {})
+    mismatched = []
+
+    for column, kind in schema.items():
+        if column not in dataframe.columns:
+            continue
+
+        values = dataframe[column]
+
+        if not (pd.api.types.is_numeric_dtype(values) or pd.api.types.is_datetime64_any_dtype(values)):
+            values = values.astype(object)
+            values = values.where(values.notna() & ~values.isin(NA_VALUES), np.nan)
+
+        try:
+            if kind == "str":
+                dataframe[column] = values if values.dtype == object else values.astype(object).where(values.isna(), values.astype(str))
+            elif kind == "date":
+                dataframe[column] = pd.to_datetime(values, format="ISO8601")
+            else:
+                dataframe[column] = pd.to_numeric(values).astype(_PANDAS_TYPES[kind])
+        except (TypeError, ValueError):
+            mismatched.append(column)
+
+    if mismatched:
+        print(f"{layer} {table} does not match its schema, keeping the stored types of {mismatched}")
+
+    return dataframe
+
+
+def read_csv_typed(filepath: str, layer: str, table: str, columns: list = None, engine: str = None) -> pd.DataFrame:
+    """Read a stored CSV with the column types declared in TABLE_SCHEMAS.
+
+    Declared string columns are not scanned for numbers and declared date
+    columns are parsed into datetime64 as they are read, so the stages do
+    not parse them again. Tables without a schema, or whose values do not
+    fit it, are read with inferred types as pd.read_csv would.
+
+    Parameters:
+    filepath -- Path of the CSV
+    layer -- Data layer of the table
+    table -- Name of the table
+    columns -- Only read these columns, kept in the order of the file
+    engine -- "pyarrow" or "c", defaults to CSV_ENGINE
+
+    Returns:
+    A Pandas DataFrame containing the table.
+    """
+    schema = TABLE_SCHEMAS.get((layer, table))
+    engine = engine or CSV_ENGINE
+
+    if schema is None:
+        return pd.read_csv(filepath, usecols=columns)
+
+    header = read_header(filepath)
+    columns = [column for column in header if columns is None or column in columns]
+
+    try:
+        if engine == "pyarrow":
+            return _read_csv_pyarrow(filepath, schema, columns)[columns]
+
+        return pd.read_csv(filepath, **csv_read_options(layer, table, columns))
+    except ValueError as e:
+        print(f"{layer} {table} does not match its schema, reading with inferred types: {e}")
+
+        return pd.read_csv(filepath, usecols=columns)
@@ -0,0 +1,483 @@
+import argparse
+import json
+import os
+import time
+
+import pandas as pd
+
+from src.utils.instrumentation import measure_memory, record_event
+from src.utils.schemas import cast_to_schema, csv_read_options, read_csv_typed, read_header
+from src.utils.utils import expand_one_hot
+
+
+# Storage format used when one is not given, e.g. ETL_STORAGE_FORMAT=parquet
+DEFAULT_FORMAT = os.environ.get("ETL_STORAGE_FORMAT", "csv")
+
+FILE_EXTENSIONS = {
+    "csv": ".csv",
+    "parquet": ".parquet",
+    "feather": ".feather",
+}
+
+LAYERS = ("source", "transformed", "validated")
+
+
+def infer_csv_types(dataframe: pd.DataFrame, stringify_dates: bool = True, exclude: tuple = ()) -> pd.DataFrame:
+    """Give string columns the types pd.read_csv would infer.
+
+    The transforms and validators were written against CSVs, so tables
+    that did not come from a CSV are converted the same way a CSV round trip
+    would: empty strings become missing, wholly numeric columns become
+    numbers and the index is reset. Dates become the strings to_csv would
+    write unless stringify_dates is False. Columns in exclude are left as
+    they are.
+    """
+    dataframe = dataframe.reset_index(drop=True)
+
+    if stringify_dates:
+        for column in dataframe.columns[dataframe.dtypes.map(pd.api.types.is_datetime64_any_dtype)]:
+            dates = dataframe[column]
+            if (dates.dropna() == dates.dropna().dt.normalize()).all():
+                dataframe[column] = dates.dt.strftime("%Y-%m-%d")
+            else:
+                dataframe[column] = dates.dt.strftime("%Y-%m-%d %H:%M:%S")
+
+    for column in dataframe.columns[dataframe.dtypes == object].difference(exclude, sort=False):
+        values = dataframe[column].replace("", None)
+        try:
+            dataframe[column] = pd.to_numeric(values)
+        except (TypeError, ValueError):
+            dataframe[column] = values
+
+    return dataframe
+
+
+def _require_pyarrow(storage_format: str) -> None:
+    """Raise an informative error if pyarrow is not installed."""
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError as e:
+        raise ImportError(f"pyarrow is required to use the {storage_format} storage format.") from e
+
+
+def table_path(layer: str, table: str, storage_format: str = None, data_dir: str = "data") -> str:
+    """Return the path of a table in a data layer."""
+    storage_format = storage_format or DEFAULT_FORMAT
+
+    if storage_format not in FILE_EXTENSIONS:
+        raise ValueError(f"Unknown storage format: {storage_format}")
+
+    return os.path.join(data_dir, layer, f"{table}{FILE_EXTENSIONS[storage_format]}")
+
+
+def partition_path(layer: str, table: str, partition: str, storage_format: str = None, data_dir: str = "data") -> str:
+    """Return the path of a partition of a partitioned table, stored in a directory named after the table."""
+    storage_format = storage_format or DEFAULT_FORMAT
+
+    if storage_format not in FILE_EXTENSIONS:
+        raise ValueError(f"Unknown storage format: {storage_format}")
+
+    return os.path.join(data_dir, layer, table, f"{partition}{FILE_EXTENSIONS[storage_format]}")
+
+
+def list_partitions(layer: str, table: str, storage_format: str = None, data_dir: str = "data") -> list:
+    """Return the names of the stored partitions of a table, in order."""
+    extension = FILE_EXTENSIONS[storage_format or DEFAULT_FORMAT]
+    directory = os.path.join(data_dir, layer, table)
+
+    if not os.path.isdir(directory):
+        return []
+
+    return sorted(name[:-len(extension)] for name in os.listdir(directory) if name.endswith(extension))
+
+
+def metadata_path(layer: str, table: str, data_dir: str = "data") -> str:
+    """Return the path of the metadata recorded beside a table."""
+    return os.path.join(data_dir, layer, f"{table}.metadata.json")
+
+
+def write_table_metadata(metadata: dict, layer: str, table: str, data_dir: str = "data") -> str:
+    """Record how a stored table was produced, such as the tokenizer that read it, replacing the file in one step."""
+    path = metadata_path(layer, table, data_dir)
+    temporary_path = f"{path}.tmp"
+
+    with open(temporary_path, "w") as f:
+        json.dump(metadata, f, indent=2, sort_keys=True)
+
+    os.replace(temporary_path, path)
+
+    return path
+
+
+def read_table_metadata(layer: str, table: str, data_dir: str = "data") -> dict:
+    """Return the metadata recorded for a stored table, or an empty dictionary if there is none."""
+    path = metadata_path(layer, table, data_dir)
+
+    if not os.path.exists(path):
+        return {}
+
+    with open(path) as f:
+        return json.load(f)
+
+
+def find_table(layer: str, table: str, data_dir: str = "data") -> tuple:
+    """Locate a stored table, preferring the default format.
+
+    Returns:
+    A tuple of the table's path and storage format.
+    """
+    formats = [DEFAULT_FORMAT] + [storage_format for storage_format in FILE_EXTENSIONS if storage_format != DEFAULT_FORMAT]
+
+    for storage_format in formats:
+        path = table_path(layer, table, storage_format, data_dir)
+        if os.path.exists(path):
+            return path, storage_format
+
+    raise FileNotFoundError(f"No stored {layer} table named {table} in {data_dir}")
+
+
+def find_partitioned_table(layer: str, table: str, data_dir: str = "data") -> str:
+    """Locate a table stored only as partitions, preferring the default format.
+
+    Returns:
+    The storage format of the partitions.
+    """
+    formats = [DEFAULT_FORMAT] + [storage_format for storage_format in FILE_EXTENSIONS if storage_format != DEFAULT_FORMAT]
+
+    for storage_format in formats:
+        if list_partitions(layer, table, storage_format, data_dir):
+            return storage_format
+
+    raise FileNotFoundError(f"No stored {layer} table named {table} in {data_dir}")
+
+
+def write_table(
+    dataframe: pd.DataFrame,
+    layer: str,
+    table: str,
+    storage_format: str = None,
+    data_dir: str = "data",
+    compression: str = "zstd",
+    partition: str = None
+) -> str:
+    """Write a table, or a partition of a table, to a data layer.
+
+    Parquet and Feather keep column dtypes, so dates and numbers do not have
+    to be parsed again by the next stage.
+
+    Parameters:
+    dataframe -- Table to write
+    layer -- Data layer to write to
+    table -- Name of the table
+    storage_format -- One of "csv", "parquet" or "feather"
+    data_dir -- Root directory of the data layers
+    compression -- Compression codec for Parquet and Feather
+    partition -- Name of the partition written, e.g. "order_month=2011-01"
+
+    Returns:
+    The path the table was written to.
+    """
+    storage_format = storage_format or DEFAULT_FORMAT
+    start = time.perf_counter()
+
+    if partition is None:
+        path = table_path(layer, table, storage_format, data_dir)
+    else:
+        path = partition_path(layer, table, partition, storage_format, data_dir)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    if storage_format != "csv":
+        # Arrow has no sparse type, categorical one-hot columns are kept as is
+        dataframe = expand_one_hot(dataframe)
+
+    with measure_memory() as memory:
+        if storage_format == "csv":
+            dataframe.to_csv(path, index=False)
+        elif storage_format == "parquet":
+            _require_pyarrow(storage_format)
+            dataframe.to_parquet(path, index=False, compression=compression)
+        else:
+            _require_pyarrow(storage_format)
+            dataframe.reset_index(drop=True).to_feather(path, compression=compression)
+
+    record_event(
+        f"write_{layer}_{table}" if partition is None else f"write_{layer}_{table}/{partition}",
+        "storage",
+        seconds=time.perf_counter() - start,
+        rows_in=len(dataframe),
+        bytes_written=os.path.getsize(path),
+        **memory
+    )
+
+    return path
+
+
+def write_table_chunks(
+    chunks,
+    layer: str,
+    table: str,
+    storage_format: str = None,
+    data_dir: str = "data",
+    compression: str = "zstd"
+) -> int:
+    """Write an iterable of DataFrame chunks to a single table.
+
+    Only one chunk is held in memory at a time. For Parquet and Feather,
+    object columns are stored as strings, so chunks whose values are all
+    missing still share the schema of the first chunk.
+
+    Chunks are written to a temporary file, which replaces the table only
+    once every chunk has been written. A stream that fails part way, or
+    yields no chunks, leaves the stored table as it was.
+
+    Returns:
+    The number of rows written.
+    """
+    storage_format = storage_format or DEFAULT_FORMAT
+    path = table_path(layer, table, storage_format, data_dir)
+    temporary_path = f"{path}.tmp"
+    rows_written = 0
+    writer = None
+    start = time.perf_counter()
+
+    if storage_format != "csv":
+        _require_pyarrow(storage_format)
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+    with measure_memory() as memory:
+        try:
+            for chunk in chunks:
+                if storage_format == "csv":
+                    chunk.to_csv(temporary_path, mode="w" if rows_written == 0 else "a", header=rows_written == 0, index=False)
+                else:
+                    if writer is None:
+                        schema = pa.Schema.from_pandas(chunk, preserve_index=False)
+                        for i, column in enumerate(chunk.columns):
+                            if chunk[column].dtype == object:
+                                schema = schema.set(i, pa.field(column, pa.string()))
+
+                        if storage_format == "parquet":
+                            writer = pq.ParquetWriter(temporary_path, schema, compression=compression)
+                        else:
+                            writer = pa.ipc.new_file(temporary_path, schema, options=pa.ipc.IpcWriteOptions(compression=compression))
+
+                    writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+
+                rows_written += len(chunk)
+        except Exception:
+            if writer is not None:
+                writer.close()
+            if os.path.exists(temporary_path):
+                os.remove(temporary_path)
+            raise
+
+    if writer is not None:
+        writer.close()
+
+    if os.path.exists(temporary_path):
+        os.replace(temporary_path, path)
+
+    record_event(
+        f"write_{layer}_{table}",
+        "storage",
+        seconds=time.perf_counter() - start,
+        rows_in=rows_written,
+        bytes_written=os.path.getsize(path) if os.path.exists(path) else 0,
+        **memory
+    )
+
+    return rows_written
+
+
+def read_table(
+    layer: str,
+    table: str,
+    columns: list = None,
+    storage_format: str = None,
+    data_dir: str = "data"
+) -> pd.DataFrame:
+    """Read a table from a data layer.
+
+    When no format is given the table is read in whichever format it was
+    stored, preferring the default format. A table stored only as
+    partitions is read whole from its partitions. CSVs are read with the
+    column types declared in TABLE_SCHEMAS.
+
+    Parameters:
+    layer -- Data layer to read from
+    table -- Name of the table
+    columns -- Only read these columns
+    storage_format -- One of "csv", "parquet" or "feather"
+    data_dir -- Root directory of the data layers
+
+    Returns:
+    A Pandas DataFrame containing the table.
+    """
+    if storage_format is None:
+        try:
+            path, storage_format = find_table(layer, table, data_dir)
+        except FileNotFoundError:
+            storage_format = find_partitioned_table(layer, table, data_dir)
+
+            return read_partitions(layer, table, columns=columns, storage_format=storage_format, data_dir=data_dir)
+    else:
+        path = table_path(layer, table, storage_format, data_dir)
+
+        if not os.path.exists(path) and list_partitions(layer, table, storage_format, data_dir):
+            return read_partitions(layer, table, columns=columns, storage_format=storage_format, data_dir=data_dir)
+
+    start = time.perf_counter()
+    with measure_memory() as memory:
+        dataframe = _read_stored(path, storage_format, layer, table, columns)
+
+    record_event(
+        f"read_{layer}_{table}",
+        "storage",
+        seconds=time.perf_counter() - start,
+        rows_out=len(dataframe),
+        bytes_read=os.path.getsize(path),
+        **memory
+    )
+
+    return dataframe
+
+
+def _read_stored(path: str, storage_format: str, layer: str, table: str, columns: list = None) -> pd.DataFrame:
+    """Read a stored table or partition file with the column types declared in TABLE_SCHEMAS."""
+    if storage_format == "csv":
+        return read_csv_typed(path, layer, table, columns)
+
+    _require_pyarrow(storage_format)
+
+    if storage_format == "parquet":
+        dataframe = pd.read_parquet(path, columns=columns)
+    else:
+        dataframe = pd.read_feather(path, columns=columns)
+
+    # Stored dtypes are kept, only declared columns are cast, so strings
+    # such as postal codes are not turned into floats
+    return cast_to_schema(dataframe, layer, table)
+
+
+def read_partitions(
+    layer: str,
+    table: str,
+    partitions: list = None,
+    columns: list = None,
+    storage_format: str = None,
+    data_dir: str = "data"
+) -> pd.DataFrame:
+    """Read some or all of the partitions of a partitioned table.
+
+    Only the partition files selected are opened, so a stage can work on a
+    range of a table larger than memory.
+
+    Parameters:
+    layer -- Data layer to read from
+    table -- Name of the table
+    partitions -- Names of the partitions to read, defaults to all of them
+    columns -- Only read these columns
+    storage_format -- One of "csv", "parquet" or "feather"
+    data_dir -- Root directory of the data layers
+
+    Returns:
+    A Pandas DataFrame containing the partitions, in partition order.
+    """
+    storage_format = storage_format or DEFAULT_FORMAT
+    stored = list_partitions(layer, table, storage_format, data_dir)
+
+    if partitions is None:
+        partitions = stored
+    elif set(partitions) - set(stored):
+        raise FileNotFoundError(f"No stored {layer} partitions of {table} named {sorted(set(partitions) - set(stored))}")
+
+    start = time.perf_counter()
+    paths = [partition_path(layer, table, partition, storage_format, data_dir) for partition in sorted(partitions)]
+    with measure_memory() as memory:
+        frames = [_read_stored(path, storage_format, layer, table, columns) for path in paths]
+        dataframe = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=columns)
+
+    record_event(
+        f"read_{layer}_{table}",
+        "storage",
+        seconds=time.perf_counter() - start,
+        rows_out=len(dataframe),
+        bytes_read=sum(os.path.getsize(path) for path in paths),
+        **memory
+    )
+
+    return dataframe
+
+
+def read_table_chunks(layer: str, table: str, chunksize: int = 100_000, data_dir: str = "data"):
+    """Yield a stored table in chunks of rows, typed as read_table would type them.
+
+    CSV chunks are read with the same declared types and date columns as
+    read_csv_typed, using the C parser, as the pyarrow engine cannot read
+    in chunks.
+    """
+    path, storage_format = find_table(layer, table, data_dir)
+
+    if storage_format == "csv":
+        yield from pd.read_csv(path, chunksize=chunksize, **csv_read_options(layer, table, read_header(path)))
+    elif storage_format == "parquet":
+        _require_pyarrow(storage_format)
+        import pyarrow.parquet as pq
+
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunksize):
+            yield cast_to_schema(batch.to_pandas(), layer, table)
+    else:
+        # Feather files are not read in batches, so the table is sliced instead
+        dataframe = read_table(layer, table, storage_format=storage_format, data_dir=data_dir)
+        for start in range(0, len(dataframe), chunksize):
+            yield dataframe.iloc[start:start + chunksize]
+
+
+def export_csv(
+    layer: str,
+    table: str,
+    data_dir: str = "data",
+    output_dir: str = None,
+    one_hot_columns: list = ()
+) -> str:
+    """Export a stored table to CSV.
+
+    Categorical one-hot columns given in one_hot_columns are expanded to one
+    boolean column per category, matching the dense one-hot layout.
+
+    Returns:
+    The path of the exported CSV.
+    """
+    dataframe = read_table(layer, table, data_dir=data_dir)
+
+    if one_hot_columns:
+        dataframe[list(one_hot_columns)] = dataframe[list(one_hot_columns)].astype("category")
+
+    dataframe = expand_one_hot(dataframe, one_hot_columns)
+    output_dir = output_dir or os.path.join(data_dir, layer)
+    os.makedirs(output_dir, exist_ok=True)
+    path = os.path.join(output_dir, f"{table}.csv")
+
+    dataframe.to_csv(path, index=False)
+
+    return path
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export stored tables to CSV.")
+    parser.add_argument("layer", choices=LAYERS)
+    parser.add_argument("tables", nargs="+")
+    parser.add_argument("--data-dir", default="data")
+    parser.add_argument("--output-dir")
+    parser.add_argument("--expand-one-hot", nargs="+", default=[], help="Categorical columns to expand to one-hot columns")
+    args = parser.parse_args()
+
+    for table_name in args.tables:
+        print(export_csv(
+            args.layer,
+            table_name,
+            data_dir=args.data_dir,
+            output_dir=args.output_dir,
+            one_hot_columns=args.expand_one_hot
+        ))
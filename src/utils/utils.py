@@ -1,9 +1,24 @@
-from datetime import date
 import numpy as np
+import os
 import pandas as pd
-import re
 
+from src.utils.dates import parse_dates
+from src.utils.deduplication import find_duplicates, write_duplicate_report
+from src.utils.instrumentation import instrument
+from src.utils.validation import (
+    customer_id_rule,
+    date_rule,
+    numeric_rule,
+    product_id_rule,
+    validate
+)
 
+
+# One-hot encoding used when one is not given, e.g. ETL_ONE_HOT_ENCODING=sparse
+ONE_HOT_ENCODING = os.environ.get("ETL_ONE_HOT_ENCODING", "dense")
+
+
+@instrument("helper")
 def check_for_missing_values(dataframe: pd.DataFrame) -> np.array:
     """Check for missing values in the dataframe and return an array containing the count of missing values."""
     missing_values = dataframe.isna().sum().values
@@ -11,76 +26,118 @@ def check_for_missing_values(dataframe: pd.DataFrame) -> np.array:
     return missing_values
 
 
-def check_for_duplicates(dataframe: pd.DataFrame) -> pd.DataFrame:
-    """Check for duplicate rows in the dataframe, print and return a dataframe with these removed."""
-    duplicated_rows = (
-        dataframe
-        .loc[dataframe.duplicated()]
-    )
+@instrument("helper")
+def check_for_duplicates(dataframe: pd.DataFrame, name: str = "table") -> pd.DataFrame:
+    """Check for duplicate rows in the dataframe, report and return a dataframe with these removed."""
+    # Each row is hashed once, giving the rows to keep and the duplicate counts
+    keep, stats = find_duplicates(dataframe)
 
-    if not duplicated_rows.empty:
+    if stats["duplicate_rows"]:
         print("Duplicates present in data.")
-        print(duplicated_rows)
+        report_path = write_duplicate_report(dataframe, keep, stats, name)
+        print(f"{stats['duplicate_rows']} duplicated row(s) in {stats['duplicate_groups']} group(s), sample written to {report_path}")
 
     # Remove duplicated rows
-    dataframe = dataframe.drop_duplicates()
+    dataframe = dataframe.loc[keep]
     print("Duplicates Removed, if present.")
 
     return dataframe
 
 
-def one_hot_encode(dataframe: pd.DataFrame, column: str) -> pd.DataFrame:
-    """Create one-hot encoded columns based on the provided categorical variable contained in the dataframe."""
-    one_hot = pd.get_dummies(dataframe[column], prefix=column, prefix_sep="_")
-    dataframe = dataframe.drop(column, axis=1)
-    dataframe = dataframe.join(one_hot)
+@instrument("helper")
+def one_hot_encode(dataframe: pd.DataFrame, columns, encoding: str = None) -> pd.DataFrame:
+    """Encode one or more categorical variables contained in the dataframe.
+
+    "dense" creates a boolean column per category, "sparse" creates the same
+    columns with a sparse dtype, and "categorical" keeps each variable as a
+    single column of category codes backed by its dictionary of categories.
+    Sparse and categorical encodings are expanded to the dense layout by
+    expand_one_hot.
+    """
+    encoding = encoding or ONE_HOT_ENCODING
+    columns = [columns] if isinstance(columns, str) else list(columns)
+
+    if encoding == "categorical":
+        for column in columns:
+            dataframe[column] = dataframe[column].astype("category")
+
+        return dataframe
+
+    if encoding not in ("dense", "sparse"):
+        raise ValueError(f"Unknown one-hot encoding: {encoding}")
+
+    # Encode every column in a single call rather than joining each in turn
+    dataframe = pd.get_dummies(dataframe, columns=columns, prefix_sep="_", sparse=encoding == "sparse")
 
     return dataframe
 
 
+@instrument("helper")
+def expand_one_hot(dataframe: pd.DataFrame, columns: list = ()) -> pd.DataFrame:
+    """Expand sparse and categorical one-hot encodings to dense boolean columns.
+
+    Sparse columns are densified in place and the given categorical columns
+    are replaced by dense columns at the end of the dataframe, matching the
+    layout produced by the dense encoding.
+    """
+    for column in dataframe.columns:
+        if isinstance(dataframe[column].dtype, pd.SparseDtype):
+            dataframe[column] = dataframe[column].sparse.to_dense()
+
+    if columns:
+        dataframe = pd.get_dummies(dataframe, columns=list(columns), prefix_sep="_")
+
+    return dataframe
+
+
+@instrument("helper")
 def standardise_customer_id(dataframe: pd.DataFrame) -> pd.DataFrame:
     """Standardise Customer ID to ensure consistency across tables"""
-    for index, value in dataframe["customer_id"].items():
-        id_length = len(value)
-        while id_length < 18:
-            value += "0"
-            id_length = len(value)
-
-        dataframe.at[index, "customer_id"] = value
+    # Right-pad IDs with zeros to 18 characters, missing IDs are left as NaN
+    dataframe["customer_id"] = dataframe["customer_id"].str.ljust(18, fillchar="0")
 
     return dataframe
 
 
-def standardise_date_format(dataframe: pd.DataFrame, column: str) -> pd.DataFrame:
+@instrument("helper")
+def upsert_by_key(dataframe: pd.DataFrame, updates: pd.DataFrame, key: str) -> pd.DataFrame:
+    """Replace every row whose key appears in the updates with the updated rows."""
+    if dataframe is None or dataframe.empty:
+        return updates.reset_index(drop=True)
+
+    dataframe = dataframe.loc[~dataframe[key].isin(updates[key])]
+
+    return pd.concat([dataframe, updates], ignore_index=True)
+
+
+@instrument("helper")
+def standardise_date_format(dataframe: pd.DataFrame, column: str, date_format: str = "%d/%m/%Y") -> pd.DataFrame:
     """Standardise Date Columns to ensure consistency across tables"""
-    dataframe[column] = pd.to_datetime(dataframe[column], format="%d/%m/%Y")
+    # Each distinct date string is parsed once, into a datetime64 column
+    dataframe[column] = parse_dates(dataframe[column], date_format)
 
     return dataframe
 
 
+@instrument("helper")
 def validate_customer_id(dataframe: pd.DataFrame, column: str) -> None:
     """Perform check to ensure customer ID is in the correct format"""
-    for customer_id in dataframe[column]:
-        if re.match(r"^[A-Za-z]{2}(?=-)", customer_id) is None or re.search(r"[0-9]{15}$", customer_id) is None:
-            raise ValueError("Customer ID does not start with two letters or does not end with 15 trailing numerical characters.")
+    validate(dataframe, [customer_id_rule(column)], fail_fast=True)
 
 
+@instrument("helper")
 def validate_date_columns(dataframe: pd.DataFrame, column: str) -> None:
     """Perform check to ensure date column is in the correct format"""
-    for date_value in dataframe[column]:
-        if not isinstance(date_value, date) and date_value is not pd.NA:
-            raise ValueError(f"{column} column is not of Date Type.")
+    validate(dataframe, [date_rule(column, f"{column} column is not of Date Type.")], fail_fast=True)
 
 
+@instrument("helper")
 def validate_numeric_columns(dataframe: pd.DataFrame, column: str) -> None:
     """Perform check to ensure numeric column is in the correct format"""
-    for value in dataframe[column]:
-        if not isinstance(value, (int, float)) and value is not pd.NA:
-            raise ValueError(f"{column} is not numeric.")
+    validate(dataframe, [numeric_rule(column, f"{column} is not numeric.")], fail_fast=True)
 
 
+@instrument("helper")
 def validate_product_id(dataframe: pd.DataFrame, column: str) -> None:
-        """Perform check to ensure Product ID meets required format"""
-        for product_id in dataframe[column]:
-            if re.match(r"^[A-Z]{3}/[A-Z]{3}-[0-9]{6}", product_id) is None:
-                raise ValueError("Product ID does not align with format")
+    """Perform check to ensure Product ID meets required format"""
+    validate(dataframe, [product_id_rule(column)], fail_fast=True)
@@ -0,0 +1,285 @@
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Callable
+import re
+
+import numpy as np
+import pandas as pd
+
+
+# Number of offending values kept on each violation for reporting
+SAMPLE_SIZE = 5
+
+CUSTOMER_ID_PATTERNS = (r"^[A-Za-z]{2}(?=-)", r"[0-9]{15}$")
+CUSTOMER_ID_MESSAGE = "Customer ID does not start with two letters or does not end with 15 trailing numerical characters."
+
+PRODUCT_ID_PATTERNS = (r"^[A-Z]{3}/[A-Z]{3}-[0-9]{6}",)
+PRODUCT_ID_MESSAGE = "Product ID does not align with format"
+
+# Inferred types of object columns whose values are all dates or numbers,
+# ignoring missing values
+DATE_TYPES = {"date", "datetime", "datetime64", "empty"}
+NUMERIC_TYPES = {"integer", "floating", "mixed-integer-float", "decimal", "boolean", "empty"}
+
+
+@dataclass
+class Rule:
+    """A named check on a single column.
+
+    The check receives the column and returns a boolean Series that is True
+    for rows violating the rule.
+    """
+    column: str
+    name: str
+    message: str
+    check: Callable[[pd.Series], pd.Series]
+
+
+@dataclass
+class Violation:
+    """Rows of a column that failed a rule."""
+    column: str
+    rule: str
+    message: str
+    count: int
+    row_indices: pd.Index
+    sample_values: list
+
+
+@dataclass
+class ValidationReport:
+    """Outcome of running a set of rules over a table."""
+    table: str
+    rows: int
+    violations: list = field(default_factory=list)
+
+    @property
+    def is_valid(self) -> bool:
+        return not self.violations
+
+    def summary(self) -> str:
+        """Describe the violations found, one line per rule."""
+        if self.is_valid:
+            return f"{self.table}: {self.rows} rows passed validation."
+
+        lines = [f"{self.table}: {len(self.violations)} rule(s) failed across {self.rows} rows."]
+        for violation in self.violations:
+            lines.append(
+                f"  {violation.column} [{violation.rule}] {violation.count} row(s) - {violation.message} "
+                f"Rows: {list(violation.row_indices[:SAMPLE_SIZE])} Samples: {violation.sample_values}"
+            )
+
+        return "\n".join(lines)
+
+    def raise_for_violations(self) -> None:
+        """Raise a ValueError describing the violations, if there are any."""
+        if not self.is_valid:
+            raise ValueError(self.summary())
+
+
+def pattern_rule(column: str, patterns, message: str) -> Rule:
+    """Rule requiring every value to match all of the given regex patterns.
+
+    Patterns are searched for anywhere in the value, so anchor them with ^
+    or $ as required. Missing and non-string values are violations.
+    """
+    if isinstance(patterns, str):
+        patterns = (patterns,)
+
+    compiled = [re.compile(pattern) for pattern in patterns]
+
+    def check(series: pd.Series) -> pd.Series:
+        valid = pd.Series(True, index=series.index)
+        for pattern in compiled:
+            valid &= series.str.contains(pattern, na=False).astype(bool)
+
+        return ~valid
+
+    return Rule(column, "pattern", message, check)
+
+
+def date_rule(column: str, message: str) -> Rule:
+    """Rule requiring every value to be a date, missing values are allowed.
+
+    Columns holding other types of value are converted in one pass, and
+    values that cannot be read as a date are violations. Numbers are
+    violations too, although they convert to a time since the epoch.
+    """
+    def check(series: pd.Series) -> pd.Series:
+        if pd.api.types.is_datetime64_any_dtype(series) or pd.api.types.infer_dtype(series) in DATE_TYPES:
+            return pd.Series(False, index=series.index)
+
+        converted = pd.to_datetime(series, errors="coerce", format="mixed").notna()
+        numbers = np.zeros(len(series), dtype=bool)
+        numbers[converted.to_numpy()] = pd.to_numeric(series[converted], errors="coerce").notna().to_numpy()
+
+        return series.notna() & (~converted | numbers)
+
+    return Rule(column, "date", message, check)
+
+
+def numeric_rule(column: str, message: str) -> Rule:
+    """Rule requiring every value to be numeric, missing values are allowed.
+
+    Columns holding other types of value are converted in one pass, and
+    values that cannot be read as a number are violations.
+    """
+    def check(series: pd.Series) -> pd.Series:
+        if pd.api.types.is_numeric_dtype(series) or pd.api.types.infer_dtype(series) in NUMERIC_TYPES:
+            return pd.Series(False, index=series.index)
+
+        return series.notna() & pd.to_numeric(series, errors="coerce").isna()
+
+    return Rule(column, "numeric", message, check)
+
+
+def range_rule(column: str, message: str, min_value=None, max_value=None) -> Rule:
+    """Rule requiring every value to fall within the inclusive bounds, missing values are allowed."""
+    def check(series: pd.Series) -> pd.Series:
+        invalid = pd.Series(False, index=series.index)
+        if min_value is not None:
+            invalid |= series < min_value
+        if max_value is not None:
+            invalid |= series > max_value
+
+        return invalid
+
+    return Rule(column, "range", message, check)
+
+
+def unique_rule(column: str, message: str) -> Rule:
+    """Rule requiring every value to appear once, all repeated rows are violations."""
+    def check(series: pd.Series) -> pd.Series:
+        return series.duplicated(keep=False)
+
+    return Rule(column, "unique", message, check)
+
+
+def customer_id_rule(column: str) -> Rule:
+    """Rule requiring customer IDs to be in the standardised format."""
+    return pattern_rule(column, CUSTOMER_ID_PATTERNS, CUSTOMER_ID_MESSAGE)
+
+
+def product_id_rule(column: str) -> Rule:
+    """Rule requiring product IDs to be in the standard format."""
+    return pattern_rule(column, PRODUCT_ID_PATTERNS, PRODUCT_ID_MESSAGE)
+
+
+@dataclass(frozen=True)
+class ColumnSpec:
+    """Declarative checks for a single column.
+
+    dtype is one of "numeric" or "date". patterns must all match each value,
+    and message overrides the generated message for the pattern check.
+    """
+    name: str
+    dtype: str = None
+    patterns: tuple = ()
+    message: str = None
+    min_value: float = None
+    max_value: float = None
+    unique: bool = False
+
+
+@dataclass(frozen=True)
+class TableSpec:
+    """Declarative checks for a table."""
+    name: str
+    columns: tuple
+
+
+@lru_cache(maxsize=None)
+def compile_table_spec(spec: TableSpec) -> tuple:
+    """Compile a table spec into its rules, grouped by column.
+
+    Specs are immutable, so each is only compiled once per process.
+    """
+    rules = []
+
+    for column in spec.columns:
+        name = column.name
+
+        if column.dtype == "numeric":
+            rules.append(numeric_rule(name, f"{name} is not numeric."))
+        elif column.dtype == "date":
+            rules.append(date_rule(name, f"{name} column is not of Date Type."))
+        elif column.dtype is not None:
+            raise ValueError(f"Unknown dtype for {name}: {column.dtype}")
+
+        if column.patterns:
+            rules.append(pattern_rule(name, column.patterns, column.message or f"{name} does not align with format."))
+
+        if column.min_value is not None and column.max_value is not None:
+            message = f"{name} is outside the bounds of {column.min_value} and {column.max_value}."
+        elif column.min_value is not None:
+            message = f"{name} is less than lower bound of {column.min_value}."
+        elif column.max_value is not None:
+            message = f"{name} exceeds upper bound of {column.max_value}."
+        else:
+            message = None
+
+        if message is not None:
+            rules.append(range_rule(name, message, min_value=column.min_value, max_value=column.max_value))
+
+        if column.unique:
+            rules.append(unique_rule(name, f"{name} contains duplicated values."))
+
+    return tuple(rules)
+
+
+def validate_table(dataframe: pd.DataFrame, spec: TableSpec, fail_fast: bool = False) -> ValidationReport:
+    """Validate a table against its declarative spec.
+
+    Parameters:
+    dataframe -- Table to validate
+    spec -- Spec describing the table's columns
+    fail_fast -- Raise a ValueError with the rule's message on the first violation
+
+    Returns:
+    A ValidationReport for the table.
+    """
+    missing_columns = [column.name for column in spec.columns if column.name not in dataframe.columns]
+
+    if missing_columns:
+        raise ValueError(f"{spec.name} is missing columns: {missing_columns}")
+
+    return validate(dataframe, list(compile_table_spec(spec)), table=spec.name, fail_fast=fail_fast)
+
+
+def validate(dataframe: pd.DataFrame, rules: list, table: str = "dataframe", fail_fast: bool = False) -> ValidationReport:
+    """Run each rule over its whole column and collect the violations.
+
+    Parameters:
+    dataframe -- Table to validate
+    rules -- Rules to apply
+    table -- Name of the table used in the report
+    fail_fast -- Raise a ValueError with the rule's message on the first violation
+
+    Returns:
+    A ValidationReport containing the count, row indices and sample values
+    for each rule that failed.
+    """
+    report = ValidationReport(table=table, rows=len(dataframe))
+
+    for rule in rules:
+        invalid = rule.check(dataframe[rule.column])
+
+        if not invalid.any():
+            continue
+
+        if fail_fast:
+            raise ValueError(rule.message)
+
+        invalid_values = dataframe.loc[invalid, rule.column]
+        report.violations.append(
+            Violation(
+                column=rule.column,
+                rule=rule.name,
+                message=rule.message,
+                count=int(invalid.sum()),
+                row_indices=invalid_values.index,
+                sample_values=invalid_values.head(SAMPLE_SIZE).tolist()
+            )
+        )
+
+    return report
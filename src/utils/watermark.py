@@ -0,0 +1,107 @@
+from datetime import datetime, timezone
+import hashlib
+import json
+import os
+import re
+
+
+# Name of the watermark file, kept in the root directory of the data layers
+WATERMARK_FILENAME = "watermarks.json"
+
+
+def file_hash(filepath: str, block_size: int = 1 << 20) -> str:
+    """Return the SHA-256 hash of a file's contents, read in blocks."""
+    digest = hashlib.sha256()
+
+    with open(filepath, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+
+    return digest.hexdigest()
+
+
+def extract_date(filepath: str) -> str:
+    """Return the YYYYMMDD date in an extract's file name, or None."""
+    match = re.search(r"(\d{8})", os.path.basename(filepath))
+
+    return match.group(1) if match else None
+
+
+def watermark_path(data_dir: str = "data") -> str:
+    """Return the path of the watermark file of a data directory."""
+    return os.path.join(data_dir, WATERMARK_FILENAME)
+
+
+def load_watermarks(path: str) -> dict:
+    """Load the processed extracts recorded for each source."""
+    if not os.path.exists(path):
+        return {}
+
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_watermarks(watermarks: dict, path: str) -> None:
+    """Save the watermarks, replacing the file in one step."""
+    temporary_path = f"{path}.tmp"
+
+    with open(temporary_path, "w") as f:
+        json.dump(watermarks, f, indent=2, sort_keys=True)
+
+    os.replace(temporary_path, path)
+
+
+def file_signature(filepath: str) -> dict:
+    """Return the size and modification time of a file, which change whenever it is rewritten."""
+    stat = os.stat(filepath)
+
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def find_pending_extracts(source: str, filepaths: list, watermarks: dict) -> dict:
+    """Return the extracts that are new or have changed since they were processed.
+
+    Only extracts whose size or modification time differ from their
+    watermark are hashed, so the cost of a run grows with the new extracts
+    rather than the history. An extract that was rewritten with the same
+    contents is not processed again, and its watermark is given the new
+    modification time.
+
+    Returns:
+    A dictionary keyed by the path of each pending extract containing its
+    size, modification time and hash, ordered by the date in the file name,
+    then by name, so later extracts are applied on top of earlier ones.
+    """
+    processed = watermarks.get(source, {})
+    pending = {}
+
+    for filepath in filepaths:
+        recorded = processed.get(os.path.basename(filepath))
+        signature = file_signature(filepath)
+
+        if recorded is not None and all(recorded.get(field) == value for field, value in signature.items()):
+            continue
+
+        signature["sha256"] = file_hash(filepath)
+
+        if recorded is not None and recorded["sha256"] == signature["sha256"]:
+            recorded.update(signature)
+        else:
+            pending[filepath] = signature
+
+    return {
+        filepath: pending[filepath]
+        for filepath in sorted(pending, key=lambda filepath: (extract_date(filepath) or "", os.path.basename(filepath)))
+    }
+
+
+def record_extract(watermarks: dict, source: str, filepath: str, signature: dict, rows: int) -> dict:
+    """Record an extract as processed for a source, with the signature found by find_pending_extracts."""
+    watermarks.setdefault(source, {})[os.path.basename(filepath)] = {
+        "extract_date": extract_date(filepath),
+        **signature,
+        "rows": rows,
+        "processed_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+    }
+
+    return watermarks
@@ -1,12 +1,29 @@
 import pandas as pd
 
-from src.utils.utils import validate_customer_id
+from src.utils.instrumentation import instrument, write_manifest
+from src.utils.storage import read_table, write_table
+from src.utils.validation import validate_table
+from src.validating.table_specs import CUSTOMER_DETAILS
+
+
+@instrument("validate", count_nulls=True)
+def validate_customer_details(customer_details: pd.DataFrame) -> pd.DataFrame:
+    """Validate transformed customer details, raising a ValueError if any check fails."""
+    # Check customer ID format to ensure it aligns with the standard
+    report = validate_table(customer_details, CUSTOMER_DETAILS)
+
+    print(report.summary())
+    report.raise_for_violations()
+
+    return customer_details
 
 
 if __name__ == "__main__":
-    customer_details = pd.read_csv("data/transformed/customer_details.csv")
+    customer_details = read_table("transformed", "customer_details")
 
-    # Check customer ID format to ensure it aligns with the standard
-    validate_customer_id(customer_details, "customer_id")
+    customer_details = validate_customer_details(customer_details)
+
+    write_table(customer_details, "validated", "customer_details")
 
-    customer_details.to_csv("data/validated/customer_details.csv", index=False)
+    manifest_path = write_manifest("validate_customer_details")
+    print(f"Run manifest written to {manifest_path}")
@@ -1,53 +1,54 @@
-import pandas as pd
-import re
+import argparse
 
-from src.utils.utils import (
-    validate_customer_id,
-    validate_date_columns,
-    validate_numeric_columns,
-    validate_product_id
-)
+import pandas as pd
 
+from src.utils.dates import parse_dates
+from src.utils.instrumentation import instrument, write_manifest
+from src.utils.storage import list_partitions, read_partitions, read_table, write_table
+from src.utils.validation import validate_table
+from src.validating.table_specs import INVOICE_DETAILS
 
-if __name__ == "__main__":
-    invoice_details = pd.read_csv("data/transformed/invoice_details.csv")
 
-    # Check order ID format to ensure it aligns with standard
-    for order_id in invoice_details["order_id"]:
-        if re.match(r"^[A-Z]{2}", order_id) is None:
-            raise ValueError("Order ID does not start with two letters.")
+@instrument("validate", count_nulls=True)
+def validate_invoice_details(invoice_details: pd.DataFrame) -> pd.DataFrame:
+    """Validate transformed invoice details, raising a ValueError if any check fails."""
+    # Convert date columns so they can be checked as dates, columns that are
+    # already datetime64 are kept as they are
+    invoice_details["order_date"] = parse_dates(invoice_details["order_date"])
+    invoice_details["ship_date"] = parse_dates(invoice_details["ship_date"])
 
-    # Check if line number is above 0
-    if invoice_details["line_no"].min() < 1:
-        raise ValueError("Line number less than lower bound of 1.")
+    # Check the table against its spec: ID formats, column types and bounds
+    report = validate_table(invoice_details, INVOICE_DETAILS)
 
-    # Check if date columns are in the correct format
+    print(report.summary())
+    report.raise_for_violations()
 
-    invoice_details["order_date"] = pd.to_datetime(invoice_details["order_date"])
-    invoice_details["ship_date"] = pd.to_datetime(invoice_details["ship_date"])
+    return invoice_details
 
-    validate_date_columns(invoice_details, "order_date")
-    validate_date_columns(invoice_details, "ship_date")
 
-    # Check customer ID format to ensure it aligns with standard
-    validate_customer_id(invoice_details, "customer_id")
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Validate the transformed invoice details.")
+    parser.add_argument(
+        "--partitions",
+        nargs="*",
+        help="Validate these partitions of the partitioned transformed table, or every partition when none are named"
+    )
+    args = parser.parse_args()
 
-    # Check product ID format to ensure it aligns with standard
-    validate_product_id(invoice_details, "product_id")
+    if args.partitions is None:
+        invoice_details = read_table("transformed", "invoice_details")
 
-    # Check if sale value is numeric
-    validate_numeric_columns(invoice_details, "sale_value")
+        invoice_details = validate_invoice_details(invoice_details)
 
-    # Check quantity value to ensure above 0
-    if invoice_details["quantity"].min() < 1:
-        raise ValueError("Quantity exceeds lower bound.")
+        write_table(invoice_details, "validated", "invoice_details")
+    else:
+        # Each partition is read, validated and written on its own
+        for partition in args.partitions or list_partitions("transformed", "invoice_details"):
+            invoice_details = read_partitions("transformed", "invoice_details", [partition])
 
-    # Check if profit and shipping cost columns are numeric
-    validate_numeric_columns(invoice_details, "profit")
-    validate_numeric_columns(invoice_details, "shipping_cost")
+            invoice_details = validate_invoice_details(invoice_details)
 
-    # Check if the discount falls within the upper and lower bound
-    if invoice_details["discount"].min() < 0 or invoice_details["discount"].max() > 1:
-        raise ValueError("Discount exceeds lower or upper bounds.")
+            write_table(invoice_details, "validated", "invoice_details", partition=partition)
 
-    invoice_details.to_csv("data/validated/invoice_details.csv", index=False)
+    manifest_path = write_manifest("validate_invoice_details")
+    print(f"Run manifest written to {manifest_path}")
@@ -1,12 +1,29 @@
 import pandas as pd
 
-from src.utils.utils import validate_product_id
+from src.utils.instrumentation import instrument, write_manifest
+from src.utils.storage import read_table, write_table
+from src.utils.validation import validate_table
+from src.validating.table_specs import PRODUCT_DETAILS
+
+
+@instrument("validate", count_nulls=True)
+def validate_product_details(product_details: pd.DataFrame) -> pd.DataFrame:
+    """Validate transformed product details, raising a ValueError if any check fails."""
+    # Check if Product ID aligns with standard format
+    report = validate_table(product_details, PRODUCT_DETAILS)
+
+    print(report.summary())
+    report.raise_for_violations()
+
+    return product_details
 
 
 if __name__ == "__main__":
-    product_details = pd.read_csv("data/transformed/product_details.csv")
+    product_details = read_table("transformed", "product_details")
 
-    # Check if Product ID aligns with standard format
-    validate_product_id(product_details, "product_id")
+    product_details = validate_product_details(product_details)
+
+    write_table(product_details, "validated", "product_details")
 
-    product_details.to_csv("data/validated/product_details.csv", index=False)
+    manifest_path = write_manifest("validate_product_details")
+    print(f"Run manifest written to {manifest_path}")
@@ -1,12 +1,29 @@
 import pandas as pd
 
-from src.utils.utils import validate_numeric_columns
+from src.utils.instrumentation import instrument, write_manifest
+from src.utils.storage import read_table, write_table
+from src.utils.validation import validate_table
+from src.validating.table_specs import REGION_DETAILS
+
+
+@instrument("validate", count_nulls=True)
+def validate_region_details(region_details: pd.DataFrame) -> pd.DataFrame:
+    """Validate transformed region details, raising a ValueError if any check fails."""
+    # Check if Region ID is Numeric
+    report = validate_table(region_details, REGION_DETAILS)
+
+    print(report.summary())
+    report.raise_for_violations()
+
+    return region_details
 
 
 if __name__ == "__main__":
-    region_details = pd.read_csv("data/transformed/region_details.csv")
+    region_details = read_table("transformed", "region_details")
 
-    # Check if Region ID is Numeric
-    validate_numeric_columns(region_details, "region_id")
+    region_details = validate_region_details(region_details)
+
+    write_table(region_details, "validated", "region_details")
 
-    region_details.to_csv("data/validated/region_details.csv", index=False)
+    manifest_path = write_manifest("validate_region_details")
+    print(f"Run manifest written to {manifest_path}")
@@ -1,34 +1,25 @@
 import pandas as pd
 
-from src.utils.utils import (
-    validate_customer_id,
-    validate_numeric_columns,
-    validate_date_columns
-)
+from src.utils.dates import parse_dates
+from src.utils.instrumentation import instrument, write_manifest
+from src.utils.storage import read_table, write_table
+from src.utils.validation import validate_table
+from src.validating.table_specs import SHIPPING_DETAILS
 
 
-if __name__ == "__main__":
-    shipping_details = pd.read_csv("data/transformed/shipping_details.csv")
-
-    # Check Shipping ID is Numeric
-    validate_numeric_columns(shipping_details, "shipping_id")
-
-    # Check Customer ID is standardised
-    validate_customer_id(shipping_details, "customer_id")
-
-    # Check Postal Code is Numeric
-    validate_numeric_columns(shipping_details, "postal_code")
-
-    # Check Date columns to ensure they are in the correct format
-
-    shipping_details.loc[:, "effective_start"] = pd.to_datetime(shipping_details["effective_start"])
-    shipping_details.loc[:, "effective_end"] = pd.to_datetime(shipping_details["effective_end"])
+@instrument("validate", count_nulls=True)
+def validate_shipping_details(shipping_details: pd.DataFrame) -> pd.DataFrame:
+    """Validate transformed shipping details, raising a ValueError if any check fails."""
+    # Convert date columns so they can be checked as dates, columns that are
+    # already datetime64 are kept as they are
+    shipping_details["effective_start"] = parse_dates(shipping_details["effective_start"])
+    shipping_details["effective_end"] = parse_dates(shipping_details["effective_end"])
 
-    validate_date_columns(shipping_details, "effective_start")
-    validate_date_columns(shipping_details, "effective_end")
+    # Check the table against its spec: ID formats, column types and bounds
+    report = validate_table(shipping_details, SHIPPING_DETAILS)
 
-    # Check Region ID is Numeric
-    validate_numeric_columns(shipping_details, "region_id")
+    print(report.summary())
+    report.raise_for_violations()
 
     # Check Duplicated Shipping ID flag
     duplicated_shipping_id = shipping_details.loc[shipping_details["is_duplicated_shipping_id"] == 1]
@@ -52,4 +43,15 @@ if __name__ == "__main__":
     # Flag Missing Address
     shipping_details.loc[shipping_details["street_address"].isna(), "is_missing_address"] = 1
 
-    shipping_details.to_csv("data/validated/shipping_details.csv", index=False)
+    return shipping_details
+
+
+if __name__ == "__main__":
+    shipping_details = read_table("transformed", "shipping_details")
+
+    shipping_details = validate_shipping_details(shipping_details)
+
+    write_table(shipping_details, "validated", "shipping_details")
+
+    manifest_path = write_manifest("validate_shipping_details")
+    print(f"Run manifest written to {manifest_path}")
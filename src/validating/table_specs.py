@@ -0,0 +1,68 @@
+from src.utils.validation import (
+    CUSTOMER_ID_MESSAGE,
+    CUSTOMER_ID_PATTERNS,
+    PRODUCT_ID_MESSAGE,
+    PRODUCT_ID_PATTERNS,
+    ColumnSpec,
+    TableSpec
+)
+
+
+CUSTOMER_ID = ColumnSpec("customer_id", patterns=CUSTOMER_ID_PATTERNS, message=CUSTOMER_ID_MESSAGE)
+PRODUCT_ID = ColumnSpec("product_id", patterns=PRODUCT_ID_PATTERNS, message=PRODUCT_ID_MESSAGE)
+
+
+CUSTOMER_DETAILS = TableSpec(
+    name="customer_details",
+    columns=(
+        CUSTOMER_ID,
+    )
+)
+
+INVOICE_DETAILS = TableSpec(
+    name="invoice_details",
+    columns=(
+        ColumnSpec("order_id", patterns=(r"^[A-Z]{2}",), message="Order ID does not start with two letters."),
+        ColumnSpec("line_no", min_value=1),
+        ColumnSpec("order_date", dtype="date"),
+        ColumnSpec("ship_date", dtype="date"),
+        CUSTOMER_ID,
+        PRODUCT_ID,
+        ColumnSpec("sale_value", dtype="numeric"),
+        ColumnSpec("quantity", min_value=1),
+        ColumnSpec("profit", dtype="numeric"),
+        ColumnSpec("shipping_cost", dtype="numeric"),
+        ColumnSpec("discount", min_value=0, max_value=1)
+    )
+)
+
+PRODUCT_DETAILS = TableSpec(
+    name="product_details",
+    columns=(
+        PRODUCT_ID,
+    )
+)
+
+REGION_DETAILS = TableSpec(
+    name="region_details",
+    columns=(
+        ColumnSpec("region_id", dtype="numeric"),
+    )
+)
+
+SHIPPING_DETAILS = TableSpec(
+    name="shipping_details",
+    columns=(
+        ColumnSpec("shipping_id", dtype="numeric"),
+        CUSTOMER_ID,
+        ColumnSpec("postal_code", dtype="numeric"),
+        ColumnSpec("effective_start", dtype="date"),
+        ColumnSpec("effective_end", dtype="date"),
+        ColumnSpec("region_id", dtype="numeric")
+    )
+)
+
+TABLE_SPECS = {
+    spec.name: spec
+    for spec in (CUSTOMER_DETAILS, INVOICE_DETAILS, PRODUCT_DETAILS, REGION_DETAILS, SHIPPING_DETAILS)
+}
@@ -0,0 +1,21 @@
+import os
+
+from benchmarks.benchmark_shipping_repair import (
+    assert_identical,
+    prepare_shipping_details,
+    repair_shipping_rows_legacy
+)
+from src.transforming.shipping_repair import repair_shipping_rows
+
+
+SAMPLE_EXTRACT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "raw", "shippuingaddress_20240521.csv.csv")
+
+
+def test_repair_matches_sequential_repair_on_sample_extract():
+    shipping_details = prepare_shipping_details(SAMPLE_EXTRACT)
+
+    expected = repair_shipping_rows_legacy(shipping_details.copy())
+    result = repair_shipping_rows(shipping_details.copy())
+
+    assert_identical(result, expected)
+